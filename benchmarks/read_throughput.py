@@ -0,0 +1,95 @@
+"""
+Throughput benchmark for the read-only API endpoints.
+
+Starts N concurrent clients that hit the dashboard's read endpoints in a loop
+for a fixed duration and reports requests/sec and latency percentiles.
+
+Run it against the API before and after a change, e.g.:
+
+    uvicorn server_py.Fastapi_main:app --port 9001 --workers 1
+    python benchmarks/read_throughput.py --url http://127.0.0.1:9001 --clients 200 --duration 30
+
+Use one uvicorn worker on both sides so the numbers compare the concurrency
+model (threadpool vs. async), not the process count.
+
+Recorded results: 200 clients, 20 s, default paths, one uvicorn worker.
+Postgres 16 on the same host held 50k Amazon_Reviews and 5k products, with
+pool 5 + 10 on each engine. The host has 1 vCPU shared by this client and
+the server, so absolute req/s is client-bound; compare the rows.
+
+    sync def routes + threadpool (before async reads)   0.1 req/s   p50 31000 ms   194 errors *
+    async routes, all crud via AsyncSession.run_sync    52.6-61.6   p50 2098-3001 ms
+    async routes, heavy crud via run_in_thread          78.5-89.0   p50 1564-1767 ms
+
+* Pool deadlock: every threadpool thread waits for a connection, and only
+  get_db's teardown returns connections, which needs a threadpool thread
+  too. Requests time out after DB_POOL_TIMEOUT (30 s).
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/analytics/summary",
+    "/analytics/category",
+    "/Amazon_Reviews/sentiment",
+    "/Amazon_Reviews/ratings",
+    "/Amazon_Reviews/categories",
+    "/Amazon_Reviews/statistics",
+    "/Amazon_Reviews/trending?limit=10",
+    "/Amazon_Reviews/reviews?limit=50",
+    "/top?table=amazon_reviews&n=10",
+    "/products?limit=10",
+]
+
+
+async def client_loop(client: httpx.AsyncClient, paths, deadline: float, latencies: list, errors: list, offset: int):
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except Exception as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(url: str, clients: int, duration: float, paths):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        latencies, errors = [], []
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            client_loop(client, paths, deadline, latencies, errors, offset)
+            for offset in range(clients)
+        ])
+        elapsed = time.perf_counter() - started
+
+    print(f"clients={clients} duration={elapsed:.1f}s requests={len(latencies)} errors={len(errors)}")
+    print(f"throughput: {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        ordered = sorted(latencies)
+        pct = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+        print(f"latency ms: mean={statistics.mean(latencies) * 1000:.1f} "
+              f"p50={pct(0.50):.1f} p95={pct(0.95):.1f} p99={pct(0.99):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:9001")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--path", action="append", dest="paths", help="Endpoint to hit (repeatable)")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.clients, args.duration, args.paths or DEFAULT_PATHS))
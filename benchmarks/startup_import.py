@@ -0,0 +1,71 @@
+"""
+Startup benchmark for the API module.
+
+Imports the app in fresh interpreters (what every uvicorn worker and every
+--reload restart does) and reports import time, peak RSS and whether the
+heavy ML libraries got loaded.
+
+Compare the current lazy loading against the old eager imports:
+
+    python benchmarks/startup_import.py --runs 5
+    python benchmarks/startup_import.py --runs 5 --preload tensorflow.keras,sklearn.preprocessing
+
+--preload imports the given modules before the app, as crud.py and
+Fastapi_main.py used to at module level.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["tensorflow", "keras", "sklearn", "torch"]
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+for name in {preload!r}:
+    __import__(name)
+import importlib
+importlib.import_module({module!r})
+seconds = time.perf_counter() - started
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_mb": rss_kb / 1024,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def probe(module: str, preload) -> dict:
+    code = PROBE.format(module=module, preload=list(preload), heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="server_py.Fastapi_main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--preload", default="", help="comma-separated modules to import first")
+    args = parser.parse_args()
+
+    preload = [name for name in args.preload.split(",") if name]
+    samples = [probe(args.module, preload) for _ in range(args.runs)]
+    seconds = [s["seconds"] for s in samples]
+    rss = [s["rss_mb"] for s in samples]
+
+    print(f"module:        {args.module}")
+    print(f"preload:       {', '.join(preload) or '-'}")
+    print(f"runs:          {args.runs}")
+    print(f"import median: {statistics.median(seconds):.2f}s (min {min(seconds):.2f}s, max {max(seconds):.2f}s)")
+    print(f"peak RSS:      {statistics.median(rss):.0f} MB per worker")
+    print(f"heavy loaded:  {', '.join(samples[-1]['heavy']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
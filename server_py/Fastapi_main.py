@@ -1,15 +1,18 @@
-from fastapi import FastAPI, Depends, Query
+from fastapi import FastAPI, Depends, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from sqlalchemy import text, func
 from typing import List, Optional
 import subprocess, json
+import logging
+import time
 from pydantic import BaseModel
 import uvicorn
 from sqlalchemy import func
-from sklearn.preprocessing import MinMaxScaler
 
 from . import crud, schemas, models
 from .database_config import get_db, engine
@@ -19,12 +22,26 @@ from contextlib import asynccontextmanager
 
 # Correct imports
 from server_py import crud, schemas, models
-from server_py.database_config import get_db, engine, Base
+from server_py.ai_cache import ai_answer_cache
+from server_py.ai_context import SOURCES as AI_CONTEXT_SOURCES, build_ai_context
+from server_py.analytics_cube import analytics_cube
+from server_py.bulkhead import bulkhead_status, bulkheads
+from server_py.cache import result_cache
+from server_py.etag import etag_middleware
+from server_py.forecast_backends import backend_status
+from server_py.forecast_worker import last_run_metrics
+from server_py.llm_client import LLMError, llm_client
+from server_py.pool_metrics import pool_status, pool_wait_middleware
+from server_py.single_flight import single_flight
+from server_py.database_config import get_db, get_async_db, async_engine, engine, Base, AsyncSessionLocal, run_in_thread
 from server_py.rapidapi import rapidapi_client
-from server_py.database_sync_service import data_sync_service
 
-# Create tables
+logger = logging.getLogger(__name__)
+
+# Create tables (columns, indexes and the initial review rollups: python -m server_py.migrate)
 Base.metadata.create_all(bind=engine)
+if analytics_cube.enabled:
+    analytics_cube.refresh_in_background()
 # Global cache
 CACHE = {
     "last_updated": None,
@@ -39,9 +56,17 @@ models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Product API", version="1.1.0")
 
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+    await llm_client.aclose()
+
 # --------------------------
 # Middleware
 # --------------------------
+# Registered before CORS so CORS stays outermost and 304s get CORS headers too
+app.middleware("http")(etag_middleware)
+app.middleware("http")(pool_wait_middleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], 
@@ -58,6 +83,7 @@ class AIQuery(BaseModel):
     question: str
     source: str  # "products" or "amazon_reviews"
     limit: Optional[int] = 50
+    stream: Optional[bool] = False
     
 def decimal_to_float(obj):
     if isinstance(obj, (int, float)):
@@ -79,43 +105,73 @@ def health_check():
 # --------------------------
 # Amazon Reviews Endpoints
 # --------------------------
-@app.get("/Amazon_Reviews/reviews", response_model=List[schemas.AmazonReview])
-def get_reviews(limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
-    return crud.get_reviews(db, limit=limit, offset=offset)
+@app.get("/Amazon_Reviews/reviews", response_model=schemas.ReviewPage)
+async def get_reviews(
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        items, next_cursor = await db.run_sync(crud.get_reviews_page, limit=limit, cursor=cursor, offset=offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor, "limit": limit}
 
 @app.get("/Amazon_Reviews/reviews/{review_id}", response_model=schemas.AmazonReview)
-def get_review(review_id: str, db: Session = Depends(get_db)):
-    return crud.get_review_by_id(db, review_id)
-
-@app.get("/Amazon_Reviews/product/{product_id}", response_model=List[schemas.AmazonReview])
-def get_product_reviews(product_id: str, limit: int = 20, db: Session = Depends(get_db)):
-    return crud.get_product_reviews(db, product_id, limit)
-
-@app.get("/Amazon_Reviews/search/{query}", response_model=List[schemas.AmazonReview])
-def search_reviews(query: str, limit: int = 50, db: Session = Depends(get_db)):
-    return crud.search_reviews(db, query, limit)
+async def get_review(review_id: str, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.get_review_by_id, review_id)
+
+@app.get("/Amazon_Reviews/product/{product_id}", response_model=schemas.ReviewPage)
+async def get_product_reviews(
+    product_id: str,
+    limit: int = 20,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        items, next_cursor = await db.run_sync(crud.get_product_reviews_page, product_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor, "limit": limit}
+
+@app.get("/Amazon_Reviews/search/{query}", response_model=schemas.ReviewSearchPage)
+async def search_reviews(query: str, limit: int = 50, offset: int = 0, db: AsyncSession = Depends(get_async_db)):
+    rows, next_offset = await db.run_sync(crud.search_reviews, query, limit=limit, offset=offset)
+    items = [
+        schemas.ReviewSearchHit(
+            **schemas.AmazonReview.model_validate(review).model_dump(),
+            rank=rank,
+            snippet=snippet,
+        )
+        for review, rank, snippet in rows
+    ]
+    return {"query": query, "items": items, "limit": limit, "offset": offset, "next_offset": next_offset}
 
 
 # --------------------------
 # Statistics Endpoints
 # --------------------------
 @app.get("/Amazon_Reviews/statistics")
-def get_statistics(db: Session = Depends(get_db)):
-    return crud.get_review_statistics(db)
+async def get_statistics():
+    return await run_in_thread(crud.get_review_statistics)
 
 @app.get("/Amazon_Reviews/sentiment", response_model=List[schemas.SentimentOut])
-def get_sentiment(db: Session = Depends(get_db)):
-    results = crud.get_sentiment_distribution(db)
+async def get_sentiment(db: AsyncSession = Depends(get_async_db)):
+    cube = await db.run_sync(analytics_cube.get_ready)
+    results = cube.sentiment_distribution() if cube else await run_in_thread(crud.get_sentiment_distribution)
     return [schemas.SentimentOut(sentiment=sentiment, count=count) for sentiment, count in results]
 
 @app.get("/Amazon_Reviews/ratings", response_model=List[schemas.RatingOut])
-def get_ratings(db: Session = Depends(get_db)):
-    results = crud.get_ratings_distribution(db)
+async def get_ratings(db: AsyncSession = Depends(get_async_db)):
+    cube = await db.run_sync(analytics_cube.get_ready)
+    results = cube.ratings_distribution() if cube else await run_in_thread(crud.get_ratings_distribution)
     return [schemas.RatingOut(rating=rating, count=count) for rating, count in results]
 
 @app.get("/Amazon_Reviews/categories", response_model=List[schemas.CategoryOut])
-def get_category_stats(db: Session = Depends(get_db)):
-    return crud.get_category_statistics(db)
+async def get_category_stats(db: AsyncSession = Depends(get_async_db)):
+    cube = await db.run_sync(analytics_cube.get_ready)
+    return cube.category_statistics() if cube else await run_in_thread(crud.get_category_statistics)
 
 # ----------- Analytics -------------
 
@@ -123,54 +179,57 @@ def get_category_stats(db: Session = Depends(get_db)):
 # Analytics Endpoints
 # --------------------------
 @app.get("/Amazon_Reviews/trending", response_model=List[schemas.TrendingProductOut])
-def get_trending(limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_trending_products(db, limit)
+async def get_trending(limit: int = 10):
+    return await run_in_thread(crud.get_trending_products, limit)
 
 @app.get("/Amazon_Reviews/trends/monthly", response_model=List[schemas.MonthlyTrendOut])
-def monthly_trends(year: int, db: Session = Depends(get_db)):
-    return crud.get_monthly_trends(db, year)
+async def monthly_trends(year: int, db: AsyncSession = Depends(get_async_db)):
+    cube = await db.run_sync(analytics_cube.get_ready)
+    return cube.monthly_trends(year) if cube else await run_in_thread(crud.get_monthly_trends, year)
 
 @app.get("/Amazon_Reviews/helpful")
-def get_helpful(limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_helpful_reviews(db, limit)
+async def get_helpful(limit: int = 10, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.get_helpful_reviews, limit)
 
 @app.get("/Amazon_Reviews/sentiment/{product_id}", response_model=List[schemas.SentimentOut])
-def get_sentiment(product_id: str, db: Session = Depends(get_db)):
-    return crud.get_product_sentiment_breakdown(db, product_id)
-
-# ----------- Products -------------
-@app.get("/products", response_model=List[schemas.Product])
-def read_products(
-    limit: int = 10,
-    offset: int = 0,
-    category: Optional[str] = None,
-    min_price: Optional[float] = None,
-    max_price: Optional[float] = None,
-    db: Session = Depends(get_db)
-):
-    return crud.get_products(db, limit, offset, category, min_price, max_price)
+async def get_product_sentiment(product_id: str):
+    return await run_in_thread(crud.get_product_sentiment_breakdown, product_id)
 
 # --------------------------
 # Products Endpoints
 # --------------------------
 @app.get("/products", response_model=List[schemas.Product])
-def read_products(
+async def read_products(
     limit: int = 10,
     offset: int = 0,
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    db: Session = Depends(get_db)
 ):
-    return crud.get_products(db, limit, offset, category, min_price, max_price)
+    return await run_in_thread(crud.get_products, limit, offset, category, min_price, max_price)
+
+@app.get("/products/{product_id}/price-history")
+async def product_price_history(
+    product_id: str,
+    bucket: str = Query("day", description="'raw', 'day' or 'week'"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """
+    Price history of one product, raw or downsampled to daily/weekly min/avg/max
+    """
+    if bucket not in ("raw", "day", "week"):
+        raise HTTPException(status_code=400, detail="bucket must be 'raw', 'day' or 'week'")
+    history = await run_in_thread(crud.get_price_history, product_id, bucket, start, end)
+    return {"product_id": product_id, "bucket": bucket, "count": len(history), "data": history}
 
 @app.get("/analytics/summary", response_model=schemas.Summary)
-def analytics_summary(db: Session = Depends(get_db)):
-    return crud.get_summary(db)
+async def analytics_summary():
+    return await single_flight.run_sync(("/analytics/summary",), crud.get_summary)
 
 @app.get("/analytics/category", response_model=schemas.CategoryAnalyticsResponse)
-def analytics_by_category(db: Session = Depends(get_db)):
-    categories = crud.get_category_analytics(db)
+async def analytics_by_category():
+    categories = await run_in_thread(crud.get_category_analytics)
     return {"categories": categories}
 
 # --------------------------
@@ -244,65 +303,104 @@ def analytics_by_category(db: Session = Depends(get_db)):
 # --------------------------
 # AI Query Endpoint
 # --------------------------
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def stream_answer(request: Request, context, cache_key: str):
+    """SSE token stream; stops (and closes the LLM request) once the client is gone"""
+    yield sse_event(context.stats(), event="context")
+    try:
+        # Held only while the generator runs, so a stream that never starts holds no slot
+        async with bulkheads["llm"].slot():
+            tokens = llm_client.stream(context.prompt)
+            parts, started = [], time.perf_counter()
+            try:
+                async for token in tokens:
+                    if await request.is_disconnected():
+                        logger.info("AI query client disconnected; cancelling generation")
+                        break
+                    parts.append(token)
+                    yield sse_event({"token": token})
+                else:
+                    # Only complete answers are cached
+                    ai_answer_cache.set(cache_key, "".join(parts).strip(), time.perf_counter() - started)
+                    yield sse_event({"cached": False}, event="done")
+            finally:
+                await tokens.aclose()
+    except HTTPException as e:
+        # Bulkhead overflow (429/503) after the response has started
+        yield sse_event({"error": e.detail, "status": e.status_code}, event="error")
+    except LLMError as e:
+        yield sse_event({"error": str(e)}, event="error")
+
+async def stream_cached_answer(answer: str):
+    yield sse_event({"token": answer})
+    yield sse_event({"cached": True}, event="done")
+
 @app.post("/ai/query")
-def ask_ai(query: AIQuery, db: Session = Depends(get_db)):
+async def ask_ai(query: AIQuery, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Answer a question about products or reviews with the local LLM.
+    Streams tokens as server-sent events when the body has "stream": true or
+    the request sends Accept: text/event-stream; otherwise returns {"answer"}.
+    Answers are cached until the source table changes.
+    """
     limit = query.limit or 50  # default 50 if not provided
     source = query.source.lower()
 
-    if source == "products":
-        # Fetch top products only
-        rows = db.execute(
-            text(f"""
-            SELECT id, category, brand, title, price, rating
-            FROM products
-            ORDER BY reviews DESC
-            LIMIT {limit}
-            """)
-        ).all()
-        data_list = [dict(row._mapping) for row in rows]
-        table_name = "Products"
-    elif source == "amazon_reviews":
-        # Fetch recent Amazon reviews only
-        rows = db.execute(
-            text(f"""
-            SELECT product_title, star_rating, review_headline, review_body, review_date
-            FROM "Amazon_Reviews"
-            ORDER BY review_date DESC
-            LIMIT {limit}
-            """)
-        ).all()
-        data_list = [dict(row._mapping) for row in rows]
-        table_name = "Amazon Reviews"
-    else:
+    if source not in AI_CONTEXT_SOURCES:
         return {"error": "Invalid source. Use 'products' or 'amazon_reviews'."}
+    stream = query.stream or "text/event-stream" in request.headers.get("accept", "")
+    sse_headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    version = await db.run_sync(ai_answer_cache.source_version, source)
+    cache_key = ai_answer_cache.make_key(query.question, source, limit, llm_client.model, version)
+    cached = ai_answer_cache.get(cache_key)
+    if cached is not None:
+        if stream:
+            return StreamingResponse(stream_cached_answer(cached), media_type="text/event-stream", headers=sse_headers)
+        return {"answer": cached, "cached": True}
+
+    context = await run_in_thread(build_ai_context, source, query.question, limit)
+    logger.info(f"AI query prompt for {source}: {context.stats()}")
+
+    if stream:
+        return StreamingResponse(
+            stream_answer(request, context, cache_key),
+            media_type="text/event-stream",
+            headers={**sse_headers, "X-Prompt-Tokens": str(context.estimated_tokens)},
+        )
 
-    # Convert to JSON safe for AI
-    data_json = json.dumps(data_list, indent=2, default=decimal_to_float)
+    async def generate():
+        async with bulkheads["llm"].slot():
+            started = time.perf_counter()
+            answer = await llm_client.generate(context.prompt)
+        ai_answer_cache.set(cache_key, answer, time.perf_counter() - started)
+        return answer
 
-    prompt = f"""
-    We have {len(data_list)} records in the {table_name} table.
+    # Identical questions asked while this one is generating share the answer
+    try:
+        answer = await single_flight.do(("/ai/query", cache_key), generate)
+    except LLMError as e:
+        answer = f"Error: {str(e)}"
 
-    Top {limit} entries:
-    {data_json}
+    return {"answer": answer, "cached": False, "context": context.stats()}
 
-    Question: {query.question}
-    Answer in simple, human-readable text using the above context.
+@app.get("/ai/cache/status")
+def get_ai_cache_status():
     """
+    Hit rate and size of the /ai/query answer cache
+    """
+    return ai_answer_cache.stats()
 
-    try:
-        result = subprocess.run(
-            ["ollama", "run", "mistral"],
-            input=prompt,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="ignore"
-        )
-        answer = result.stdout.strip()
-    except Exception as e:
-        answer = f"Error: {str(e)}"
-
-    return {"answer": answer}
+@app.post("/ai/cache/clear")
+def clear_ai_cache():
+    """
+    Drop every cached AI answer (memory and disk)
+    """
+    ai_answer_cache.clear()
+    return {"success": True, "timestamp": datetime.now().isoformat()}
 
 # @app.get("/products/top", response_model=List[schemas.Product])
 # def top_products_products_table(n: int = 10, db: Session = Depends(get_db)):
@@ -320,10 +418,10 @@ def ask_ai(query: AIQuery, db: Session = Depends(get_db)):
 # Forecast Endpoints
 # --------------------------
 @app.get("/top")
-def get_top_items(
+async def get_top_items(
     table: str = Query(..., description="Choose 'products' or 'amazon_reviews'"),
     n: int = Query(10, description="Number of top items to fetch"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Fetch top N entries from either products or Amazon_Reviews table.
@@ -332,22 +430,30 @@ def get_top_items(
     table = table.lower()
     
     if table == "products":
-        data = crud.get_top_products(db, n)
+        data = await db.run_sync(crud.get_top_products, n)
         return {"table": "products", "count": len(data), "data": data}
     elif table == "amazon_reviews":
-        data = crud.get_top_products_amazon(db, n)
+        data = await run_in_thread(crud.get_top_products_amazon, n)
         return {"table": "amazon_reviews", "count": len(data), "data": data}
     else:
         return {"error": "Invalid table. Use 'products' or 'amazon_reviews'."}
     
 @app.get("/top_forecast")
-def top_forecasted_products(n: int = Query(10, description="Number of top products"), db: Session = Depends(get_db)):
+async def top_forecasted_products(n: int = Query(10, description="Number of top products")):
     """
-    Fetch top N products by forecasted next price
+    Fetch top N products by forecasted next price (precomputed by the forecast job)
     """
-    forecast_list = crud.get_top_forecasted_products(db, n)
+    forecast_list = await single_flight.run_sync(("/top_forecast", n), crud.get_top_forecasted_products, n)
     return {"table": "products_forecast", "count": len(forecast_list), "data": forecast_list} 
 
+@app.get("/forecast/status")
+def forecast_status():
+    """
+    Throughput and skip/warm-start counts of the last LSTM training run,
+    and which forecast backends this process has imported
+    """
+    return {"last_run": last_run_metrics(), "backends": backend_status()}
+
 @app.get("/notifications")
 def get_notifications(
     table: str = Query("products", description="Choose 'products' or 'amazon_reviews'"),
@@ -394,14 +500,6 @@ def get_notifications(
     else:
         return {"error": "Invalid table. Use 'products' or 'amazon_reviews'."}
 
-@app.get("/top_forecast")
-def top_forecasted_products(n: int = Query(10, description="Number of top products"), db: Session = Depends(get_db)):
-    """
-    Fetch top N products by forecasted next price
-    """
-    forecast_list = crud.get_top_forecasted_products(db, n)
-    return {"table": "products_forecast", "count": len(forecast_list), "data": forecast_list}    
-
 # --------------------------
 # signup/login Endpoints
 # --------------------------
@@ -414,44 +512,12 @@ app.include_router(users.router, prefix="/users")
 # Filter Options Endpoint
 # --------------------------
 @app.get("/Amazon_Reviews/filter-options")
-def get_filter_options(db: Session = Depends(get_db)):
+async def get_filter_options():
     """
     Get available filter options (categories, ratings, price range)
     """
     try:
-        # Get unique categories from Amazon_Reviews
-        categories_query = db.query(models.AmazonReview.product_category)\
-            .distinct()\
-            .filter(models.AmazonReview.product_category.isnot(None))\
-            .filter(models.AmazonReview.product_category != '')\
-            .all()
-        category_list = sorted([cat[0] for cat in categories_query if cat[0]])
-        
-        # Get unique star ratings from Amazon_Reviews
-        ratings_query = db.query(models.AmazonReview.star_rating)\
-            .distinct()\
-            .filter(models.AmazonReview.star_rating.isnot(None))\
-            .order_by(models.AmazonReview.star_rating)\
-            .all()
-        rating_list = sorted([int(r[0]) for r in ratings_query if r[0] and r[0] > 0])
-        
-        # Get price range from products table
-        price_stats = db.query(
-            func.min(models.Product.price).label('min_price'),
-            func.max(models.Product.price).label('max_price')
-        ).filter(models.Product.price.isnot(None)).first()
-        
-        min_price = float(price_stats.min_price) if price_stats and price_stats.min_price else 0
-        max_price = float(price_stats.max_price) if price_stats and price_stats.max_price else 100000
-        
-        return {
-            "categories": category_list,
-            "ratings": rating_list,
-            "price_range": {
-                "min": int(min_price),
-                "max": int(max_price)
-            }
-        }
+        return await run_in_thread(crud.get_filter_options)
     except Exception as e:
         print(f"Error fetching filter options: {e}")
         return {
@@ -466,106 +532,115 @@ def get_filter_options(db: Session = Depends(get_db)):
 # Filtered Analytics Endpoint
 # --------------------------
 @app.get("/Amazon_Reviews/analytics/filtered")
-def get_filtered_analytics(
+async def get_filtered_analytics(
     category: Optional[str] = None,
     min_rating: Optional[int] = None,
     date_range: Optional[str] = "all",
-    db: Session = Depends(get_db)
+    single_pass: bool = Query(True, description="Compute all charts in one GROUPING SETS query"),
 ):
     """
     Get analytics data based on applied filters for charts
     """
-    try:
-        # Base query
-        query = db.query(models.AmazonReview)
-        
-        # Apply filters
-        if category and category != "All Categories":
-            query = query.filter(models.AmazonReview.product_category == category)
-        
-        if min_rating and min_rating > 0:
-            query = query.filter(models.AmazonReview.star_rating >= min_rating)
-        
-        # Date range filter
-        if date_range != "all":
-            from datetime import datetime, timedelta
-            today = datetime.now()
-            
-            if date_range == "7d":
-                start_year = today.year
-                # Simple approximation - filter by year
-            elif date_range == "30d":
-                start_year = today.year
-            elif date_range == "90d":
-                start_year = today.year
-            elif date_range == "1y":
-                start_year = today.year - 1
+    async def compute():
+        conditions = crud.filtered_review_conditions(category, min_rating, date_range)
+        async with bulkheads["analytics"].slot(), AsyncSessionLocal() as db:
+            cube = await db.run_sync(analytics_cube.get_ready)
+
+            started = time.perf_counter()
+            if cube:
+                result = cube.filtered_analytics(category, min_rating, date_range)
+                mode = "cube"
+            elif single_pass:
+                result = await run_in_thread(crud.get_filtered_analytics_single_pass, conditions)
+                mode = "single_pass"
             else:
-                start_year = None
-            
-            if start_year:
-                query = query.filter(models.AmazonReview.review_year >= start_year)
-        
-        # Get sentiment distribution
-        sentiment_dist = query.with_entities(
-            models.AmazonReview.Sentiment_pc,
-            func.count(models.AmazonReview.review_id).label('count')
-        ).group_by(models.AmazonReview.Sentiment_pc).all()
-        
-        # Get rating distribution
-        rating_dist = query.with_entities(
-            models.AmazonReview.star_rating,
-            func.count(models.AmazonReview.review_id).label('count')
-        ).group_by(models.AmazonReview.star_rating).all()
-        
-        # Get category stats
-        category_stats = query.with_entities(
-            models.AmazonReview.product_category,
-            func.count(models.AmazonReview.review_id).label('count'),
-            func.avg(models.AmazonReview.star_rating).label('avg_rating')
-        ).group_by(models.AmazonReview.product_category).all()
-        
-        # Get top products
-        top_products = query.with_entities(
-            models.AmazonReview.product_title,
-            func.count(models.AmazonReview.review_id).label('review_count'),
-            func.avg(models.AmazonReview.star_rating).label('avg_rating')
-        ).group_by(models.AmazonReview.product_title)\
-         .order_by(func.count(models.AmazonReview.review_id).desc())\
-         .limit(10).all()
-        
-        return {
-            "sentiment_distribution": [
-                {"sentiment": s[0], "count": s[1]} for s in sentiment_dist
-            ],
-            "rating_distribution": [
-                {"rating": r[0], "count": r[1]} for r in rating_dist
-            ],
-            "category_stats": [
-                {
-                    "category": c[0],
-                    "count": c[1],
-                    "avg_rating": float(c[2]) if c[2] else 0
-                } for c in category_stats
-            ],
-            "top_products": [
-                {
-                    "product_title": p[0],
-                    "review_count": p[1],
-                    "avg_rating": float(p[2]) if p[2] else 0
-                } for p in top_products
-            ],
-            "total_reviews": query.count(),
-            "average_rating": float(query.with_entities(
-                func.avg(models.AmazonReview.star_rating)
-            ).scalar() or 0)
-        }
-        
+                result = await run_in_thread(crud.get_filtered_analytics_multi, conditions)
+                mode = "multi_query"
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        logger.info(
+            f"Filtered analytics ({mode}) category={category!r} min_rating={min_rating} "
+            f"date_range={date_range!r}: {elapsed_ms:.1f} ms"
+        )
+        return {**result, "timing": {"mode": mode, "elapsed_ms": round(elapsed_ms, 2)}}
+
+    try:
+        key = ("/Amazon_Reviews/analytics/filtered", category or None, min_rating, date_range or "all", single_pass)
+        return await single_flight.do(key, compute)
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error getting filtered analytics: {e}")
         return {"error": str(e)}
 
 
+# --------------------------
+# Database Pool Endpoints
+# --------------------------
+@app.get("/db/pool/status")
+def get_db_pool_status():
+    """
+    Pool occupancy gauges and checkout wait times (per checkout and per request)
+    """
+    return pool_status(**{"sync": engine, "async": async_engine.sync_engine})
+
+
+# --------------------------
+# Result Cache Endpoints
+# --------------------------
+@app.get("/cache/status")
+def get_cache_status():
+    """
+    Hit/miss/eviction counters for the crud result cache
+    """
+    return result_cache.stats()
+
+@app.post("/cache/clear")
+def clear_cache():
+    """
+    Drop every cached result (local and shared tiers)
+    """
+    result_cache.clear()
+    return {"success": True, "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/bulkheads/status")
+def get_bulkhead_status():
+    """
+    Active requests, queue depth, rejections and queue wait per bulkhead
+    """
+    return bulkhead_status()
+
+@app.get("/single_flight/status")
+def get_single_flight_status():
+    """
+    How many requests per route ran a computation vs. joined one already in flight
+    """
+    return single_flight.stats()
+
+
+# --------------------------
+# Analytics Cube Endpoints
+# --------------------------
+@app.get("/analytics/cube/status")
+def get_analytics_cube_status():
+    """
+    In-memory analytics cube state and memory footprint (for sizing workers)
+    """
+    return analytics_cube.status()
+
+@app.post("/analytics/cube/refresh")
+def refresh_analytics_cube():
+    """
+    Reload the analytics cube from the database in the background
+    """
+    if not analytics_cube.enabled:
+        return {"success": False, "error": "Analytics cube is disabled (set ANALYTICS_CUBE_ENABLED=true)"}
+    analytics_cube.refresh_in_background()
+    return {"success": True, "message": "Analytics cube refresh started"}
+
+
 # @app.post("/api/cache/refresh")
 # async def refresh_cache():
 #     """
@@ -630,8 +705,7 @@ def get_filtered_analytics(
 # ============================================
 
 # Add these imports at the top
-from server_py.schedule import get_scheduler_status, trigger_manual_sync
-from server_py.database_sync_service import data_sync_service
+from server_py.schedule import enqueue_job, get_job, get_pipeline_status, get_scheduler_status, trigger_manual_sync
 
 # Add these endpoints after your existing endpoints
 
@@ -640,86 +714,83 @@ from server_py.database_sync_service import data_sync_service
 # --------------------------
 
 @app.get("/scheduler/status")
-def get_scheduler_status_endpoint():
+def get_scheduler_status_endpoint(db: Session = Depends(get_db)):
     """
-    Get current scheduler status and scheduled jobs
+    Get scheduled jobs plus queued, running and recent runs (jobs run in the scheduler worker)
     """
-    return get_scheduler_status()
+    return get_scheduler_status(db)
 
-@app.post("/scheduler/trigger-sync")
-def trigger_sync_manually():
+@app.get("/scheduler/jobs/{job_id}")
+def get_scheduler_job(job_id: int, db: Session = Depends(get_db)):
     """
-    Manually trigger a full data sync (for testing/debugging)
+    Status and result of one queued or scheduled job run
     """
-    try:
-        logger.info("Manual sync triggered via API")
-        trigger_manual_sync()
-        return {
-            "success": True,
-            "message": "Full data sync triggered successfully",
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        logger.error(f"Error triggering sync: {e}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    job = get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def queued_response(job: dict, message: str):
+    return {
+        "success": True,
+        "message": message,
+        "job_id": job["id"],
+        "status": job["status"],
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/scheduler/trigger-sync", status_code=202)
+def trigger_sync_manually(db: Session = Depends(get_db)):
+    """
+    Queue a full data sync for the scheduler worker (poll /scheduler/jobs/{job_id})
+    """
+    logger.info("Manual sync triggered via API")
+    return queued_response(trigger_manual_sync(db), "Full data sync queued")
 
-@app.post("/sync/amazon")
-def sync_amazon_data():
+@app.post("/sync/amazon", status_code=202)
+def sync_amazon_data(db: Session = Depends(get_db)):
     """
-    Manually sync Amazon data only
+    Queue an Amazon-only sync for the scheduler worker
     """
-    try:
-        logger.info("Amazon sync triggered via API")
-        result = data_sync_service.sync_amazon_products_by_search()
-        return {
-            "success": True,
-            "message": "Amazon data synced",
-            "products_synced": result,
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    logger.info("Amazon sync triggered via API")
+    return queued_response(enqueue_job(db, "amazon_sync"), "Amazon data sync queued")
 
-@app.post("/sync/flipkart")
-def sync_flipkart_data():
+@app.post("/sync/flipkart", status_code=202)
+def sync_flipkart_data(db: Session = Depends(get_db)):
     """
-    Manually sync Flipkart data only
+    Queue a Flipkart-only sync for the scheduler worker
     """
-    try:
-        logger.info("Flipkart sync triggered via API")
-        result = data_sync_service.sync_flipkart_products()
-        return {
-            "success": True,
-            "message": "Flipkart data synced",
-            "products_synced": result,
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    logger.info("Flipkart sync triggered via API")
+    return queued_response(enqueue_job(db, "flipkart_sync"), "Flipkart data sync queued")
+
+@app.get("/sync/runs")
+async def sync_runs(limit: int = 50, db: AsyncSession = Depends(get_async_db)):
+    """Category crawl checkpoints, newest first; unfinished runs resume on the next sync"""
+    return await db.run_sync(crud.get_sync_runs, limit)
+
+@app.get("/sync/pipeline/status")
+def sync_pipeline_status(db: Session = Depends(get_db)):
+    """Per-stage throughput, utilization and queue depth of the running or last sync (reported by the worker)"""
+    return get_pipeline_status(db)
 
 @app.get("/sync/test-api")
-def test_rapid_api_connection():
+async def test_rapid_api_connection():
     """
     Test RapidAPI connection and credentials
     """
+    return await bulkheads["sync"].run(check_rapid_api_connection)
+
+def check_rapid_api_connection():
     from server_py.rapidapi import rapidapi_client
     
+    # use_cache=False: a cached response would report "connected" without reaching RapidAPI
     try:
         # Test Amazon API
-        amazon_result = rapidapi_client.search_amazon_products("laptop", page=1)
+        amazon_result = rapidapi_client.search_amazon_products("laptop", page=1, use_cache=False)
         amazon_success = 'error' not in amazon_result and len(amazon_result.get('results', [])) > 0
         
         # Test Flipkart API
-        flipkart_result = rapidapi_client.search_flipkart_products("laptop", page=1)
+        flipkart_result = rapidapi_client.search_flipkart_products("laptop", page=1, use_cache=False)
         flipkart_success = 'error' not in flipkart_result and len(flipkart_result.get('results', [])) > 0
         
         return {
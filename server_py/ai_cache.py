@@ -0,0 +1,101 @@
+# ============================================
+# /ai/query answer cache
+# ============================================
+# File: server_py/ai_cache.py
+#
+# Answers are keyed by the normalized question, source, row limit, model and
+# the data_versions counter of the source table, so an answer is reused until
+# the data it was generated from changes. Tier 1 is an in-process LRU, tier 2
+# an optional SQLite file (AI_CACHE_SQLITE_PATH) that survives restarts and is
+# shared by every worker on the host. Hits and misses are counted by the
+# tiers; a lookup misses only in the last tier it consults.
+
+import hashlib
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from .cache import LRUCache, SQLiteBackend, _MISSING, result_cache
+
+# /ai/query source -> table whose version the answer depends on
+AI_SOURCE_TABLES = {
+    "products": "products",
+    "amazon_reviews": "Amazon_Reviews",
+}
+
+
+def normalize_question(question: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer"""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+
+class AIAnswerCache:
+    """LRU (+ optional SQLite) cache of complete LLM answers"""
+
+    def __init__(self):
+        ttl = float(os.getenv("AI_CACHE_TTL", str(24 * 3600)))
+        self.local = LRUCache(maxsize=int(os.getenv("AI_CACHE_MAXSIZE", "256")), ttl=ttl)
+        disk_path = os.getenv("AI_CACHE_SQLITE_PATH")
+        self.disk = SQLiteBackend(disk_path) if disk_path else None
+        self._lock = threading.Lock()
+        self.generations = 0
+        self.generation_seconds = 0.0
+
+    def source_version(self, db: Session, source: str) -> int:
+        table = AI_SOURCE_TABLES[source]
+        return result_cache.versions.get(db, [table])[table]
+
+    def make_key(self, question: str, source: str, limit: int, model: str, version: int) -> str:
+        digest = hashlib.sha1(normalize_question(question).encode("utf-8")).hexdigest()
+        return f"ai:{model}:{source}:{limit}:{digest}|{AI_SOURCE_TABLES[source]}={version}"
+
+    def get(self, key: str) -> Optional[str]:
+        answer = self.local.get(key)
+        if answer is _MISSING and self.disk is not None:
+            answer = self.disk.get(key)
+            if answer is not _MISSING:
+                self.local.set(key, answer)
+        return None if answer is _MISSING else answer
+
+    def set(self, key: str, answer: str, seconds: float = 0.0) -> None:
+        """Store a complete answer; seconds is how long the LLM took to produce it"""
+        if not answer:
+            return
+        self.local.set(key, answer)
+        if self.disk is not None:
+            self.disk.set(key, answer, self.local.ttl)
+        with self._lock:
+            self.generations += 1
+            self.generation_seconds += seconds
+
+    def clear(self) -> None:
+        self.local.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        local = self.local.stats()
+        disk = self.disk.stats() if self.disk is not None else None
+        hits = local["hits"] + (disk["hits"] if disk else 0)
+        misses = disk["misses"] if disk else local["misses"]
+        with self._lock:
+            generations, generation = self.generations, self.generation_seconds
+        lookups = hits + misses
+        mean_generation = generation / generations if generations else None
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "mean_generation_seconds": round(mean_generation, 3) if mean_generation is not None else None,
+            # Rough LLM time avoided, assuming a hit would have cost an average miss
+            "llm_seconds_saved": round(hits * mean_generation, 1) if mean_generation is not None else None,
+            "local": local,
+            "disk": disk,
+        }
+
+
+# Create global instance
+ai_answer_cache = AIAnswerCache()
@@ -0,0 +1,161 @@
+# ============================================
+# Token-budgeted context for /ai/query prompts
+# ============================================
+# File: server_py/ai_context.py
+#
+# A prompt is built from:
+#   1. summary statistics of the source, from the same cached aggregates the
+#      dashboard endpoints serve (rollups, not a scan of the raw rows)
+#   2. a few representative rows as a pipe-separated table, long text cut
+#      to AI_CONTEXT_MAX_TEXT characters
+# Rows are added until the estimated prompt size reaches AI_CONTEXT_TOKEN_BUDGET.
+# Tokens are estimated at ~4 characters each; no tokenizer is loaded.
+
+import os
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import crud
+
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "1500"))
+AI_CONTEXT_MAX_TEXT = int(os.getenv("AI_CONTEXT_MAX_TEXT", "160"))
+AI_CONTEXT_TOP_GROUPS = int(os.getenv("AI_CONTEXT_TOP_GROUPS", "8"))
+CHARS_PER_TOKEN = 4
+
+INSTRUCTIONS = "Answer in simple, human-readable text using only the context above."
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_value(value: Any, max_text: int = AI_CONTEXT_MAX_TEXT) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (float, Decimal)):
+        return f"{float(value):.2f}".rstrip("0").rstrip(".")
+    if hasattr(value, "isoformat"):
+        return value.isoformat()[:10]
+    text = " ".join(str(value).split()).replace("|", "/")
+    return text if len(text) <= max_text else text[:max_text - 1] + "…"
+
+
+@dataclass
+class AIContext:
+    prompt: str
+    rows_available: int
+    rows_included: int
+    truncated_values: int
+    budget: int
+    sections: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def estimated_tokens(self) -> int:
+        return estimate_tokens(self.prompt)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "estimated_tokens": self.estimated_tokens,
+            "budget": self.budget,
+            "rows_included": self.rows_included,
+            "rows_available": self.rows_available,
+            "truncated_values": self.truncated_values,
+            "section_tokens": self.sections,
+        }
+
+
+# --------------------------
+# Per-source summaries
+# --------------------------
+def _products_summary(db: Session) -> List[str]:
+    summary = crud.get_summary(db)
+    lines = [
+        f"Total products: {summary['total_products']}, average price: {compact_value(summary['avg_price'])}, "
+        f"average rating: {compact_value(summary['avg_rating'])}, total reviews: {summary['total_reviews']}",
+        "Top categories (category | products | avg price | avg rating | reviews):",
+    ]
+    for row in crud.get_category_analytics(db)[:AI_CONTEXT_TOP_GROUPS]:
+        lines.append(" | ".join(compact_value(row[k]) for k in
+                                ("category", "total_products", "avg_price", "avg_rating", "total_reviews")))
+    return lines
+
+
+def _reviews_summary(db: Session) -> List[str]:
+    stats = crud.get_review_statistics(db)
+    sentiment = ", ".join(f"{label or 'unknown'}: {count}" for label, count in crud.get_sentiment_distribution(db))
+    ratings = ", ".join(f"{rating}★: {count}" for rating, count in sorted(
+        crud.get_ratings_distribution(db), key=lambda r: (r[0] is None, r[0])) if rating is not None)
+    categories = sorted(crud.get_category_statistics(db), key=lambda c: c["count"], reverse=True)
+    return [
+        f"Total reviews: {stats['total_reviews']}, average rating: {compact_value(stats['average_rating'])}",
+        f"Sentiment: {sentiment}",
+        f"Ratings: {ratings}",
+        "Top categories: " + ", ".join(
+            f"{c['category']}: {c['count']}" for c in categories[:AI_CONTEXT_TOP_GROUPS] if c["category"]),
+    ]
+
+
+def _spread_by(key: str) -> Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """Interleave rows round-robin over a column so a short sample covers every value"""
+    def order(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(row.get(key), []).append(row)
+        buckets = [groups[k] for k in sorted(groups, key=lambda k: (k is None, str(k)))]
+        return [bucket[i] for i in range(max(map(len, buckets), default=0)) for bucket in buckets if i < len(bucket)]
+    return order
+
+
+# source -> (summary builder, columns shown, sample ordering)
+SOURCES: Dict[str, Tuple[Callable[[Session], List[str]], Tuple[str, ...], Callable]] = {
+    "products": (
+        _products_summary,
+        ("category", "brand", "title", "price", "rating"),
+        _spread_by("category"),
+    ),
+    "amazon_reviews": (
+        _reviews_summary,
+        ("star_rating", "product_title", "review_headline", "review_body", "review_date"),
+        _spread_by("star_rating"),
+    ),
+}
+
+
+def build_ai_context(db: Session, source: str, question: str, limit: int = 50,
+                     budget: int = AI_CONTEXT_TOKEN_BUDGET) -> AIContext:
+    """Build the prompt for a question about a source, within a token budget"""
+    summarize, columns, order = SOURCES[source]
+    table_name, rows = crud.get_ai_context_rows(db, source, limit)
+
+    summary = "\n".join(summarize(db))
+    tail = f"\nQuestion: {question}\n{INSTRUCTIONS}\n"
+    head = f"Context: {table_name}\n\nSummary statistics:\n{summary}\n\nSample rows ({' | '.join(columns)}):\n"
+
+    used = estimate_tokens(head) + estimate_tokens(tail)
+    lines, truncated = [], 0
+    for row in order(rows):
+        values = [compact_value(row.get(c)) for c in columns]
+        line = " | ".join(values)
+        cost = estimate_tokens(line + "\n")
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+        truncated += sum(1 for v in values if v.endswith("…"))
+
+    prompt = head + "\n".join(lines) + "\n" + tail
+    return AIContext(
+        prompt=prompt,
+        rows_available=len(rows),
+        rows_included=len(lines),
+        truncated_values=truncated,
+        budget=budget,
+        sections={
+            "summary": estimate_tokens(summary),
+            "rows": estimate_tokens("\n".join(lines)),
+            "question": estimate_tokens(tail),
+        },
+    )
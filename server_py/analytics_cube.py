@@ -0,0 +1,286 @@
+# ============================================
+# In-memory columnar analytics cube
+# ============================================
+# File: server_py/analytics_cube.py
+#
+# Optional in-process copy of the Amazon_Reviews columns the dashboard filters
+# and groups on. Low-cardinality fields are dictionary-encoded and get one
+# packed bitmap per value, so a filter is a few bitwise ANDs and a group-by
+# is a vectorized np.bincount. Enable with ANALYTICS_CUBE_ENABLED=true.
+
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import crud
+from .database_config import engine
+
+logger = logging.getLogger(__name__)
+
+# Cube dimension -> Amazon_Reviews column
+DIMENSIONS = {
+    "category": "product_category",
+    "marketplace": "market_place",
+    "sentiment": "Sentiment_pc",
+    "star_rating": "star_rating",
+    "year": "review_year",
+    "month": "review_month",
+}
+
+LOAD_SQL = """
+SELECT product_category, market_place, "Sentiment_pc", star_rating,
+       review_year, review_month, product_title
+FROM "Amazon_Reviews"
+"""
+
+# Total review count from the rollups; changes whenever reviews are loaded
+VERSION_SQL = "SELECT COALESCE(SUM(review_count), 0) FROM review_rollups"
+
+
+def _plain(value: Any) -> Any:
+    """Convert NumPy scalars / NaN / NA dictionary entries to plain Python values"""
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class _CubeData:
+    """Immutable snapshot of the encoded columns; refresh swaps in a new one"""
+
+    def __init__(self, df: pd.DataFrame, version: int):
+        self.n = len(df)
+        self.version = version
+        self.loaded_at = datetime.now()
+
+        self.codes: Dict[str, np.ndarray] = {}
+        self.values: Dict[str, List[Any]] = {}
+        self.bitmaps: Dict[str, np.ndarray] = {}
+        for dim, column in DIMENSIONS.items():
+            codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+            codes = codes.astype(np.int16 if len(uniques) < 2 ** 15 else np.int32)
+            self.codes[dim] = codes
+            self.values[dim] = [_plain(v) for v in uniques]
+            # One packed bitmap row per dictionary value
+            bitmaps = np.empty((len(uniques), (self.n + 7) // 8), dtype=np.uint8)
+            for code in range(len(uniques)):
+                bitmaps[code] = np.packbits(codes == code)
+            self.bitmaps[dim] = bitmaps
+
+        title_codes, titles = pd.factorize(df["product_title"], use_na_sentinel=False)
+        self.title_codes = title_codes.astype(np.int32)
+        self.titles = [_plain(v) for v in titles]
+
+        ratings = pd.to_numeric(df["star_rating"], errors="coerce").to_numpy(dtype=np.float32)
+        self.rated = ~np.isnan(ratings)
+        self.ratings = np.where(self.rated, ratings, 0).astype(np.float32)
+
+    def lookup(self, dim: str, value: Any) -> Optional[int]:
+        try:
+            return self.values[dim].index(value)
+        except ValueError:
+            return None
+
+    def any_of(self, dim: str, predicate: Callable[[Any], bool]) -> np.ndarray:
+        """OR together the bitmaps of every dictionary value matching predicate"""
+        matching = [code for code, value in enumerate(self.values[dim])
+                    if value is not None and predicate(value)]
+        if not matching:
+            return np.zeros(self.bitmaps[dim].shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitmaps[dim][matching], axis=0)
+
+    def memory_usage(self) -> Dict[str, int]:
+        usage = {
+            f"codes.{dim}": arr.nbytes for dim, arr in self.codes.items()
+        }
+        usage.update({f"bitmaps.{dim}": arr.nbytes for dim, arr in self.bitmaps.items()})
+        usage["title_codes"] = self.title_codes.nbytes
+        usage["ratings"] = self.ratings.nbytes + self.rated.nbytes
+        usage["dictionaries"] = sum(
+            sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+            for values in list(self.values.values()) + [self.titles]
+        )
+        return usage
+
+
+class AnalyticsCube:
+    """Loads, refreshes and queries the columnar Amazon_Reviews snapshot"""
+
+    def __init__(self):
+        self.enabled = os.getenv("ANALYTICS_CUBE_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.check_interval = float(os.getenv("ANALYTICS_CUBE_CHECK_SECONDS", "30"))
+        self._data: Optional[_CubeData] = None
+        self._refresh_lock = threading.Lock()
+        self._last_check = 0.0
+        self.last_load_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._data is not None
+
+    # ---------- loading ----------
+
+    def refresh(self) -> None:
+        """Reload the snapshot from PostgreSQL; concurrent calls are skipped"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            started = time.perf_counter()
+            with engine.connect() as conn:
+                version = conn.execute(text(VERSION_SQL)).scalar()
+                df = pd.read_sql(text(LOAD_SQL), conn)
+            self._data = _CubeData(df, int(version or 0))
+            self.last_load_seconds = time.perf_counter() - started
+            logger.info(
+                f"Analytics cube loaded {self._data.n} reviews in {self.last_load_seconds:.2f}s "
+                f"({self.memory_footprint()['total_bytes'] / 2 ** 20:.1f} MiB)"
+            )
+        except Exception as e:
+            logger.error(f"Error loading analytics cube: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_in_background(self) -> None:
+        threading.Thread(target=self.refresh, name="analytics-cube-refresh", daemon=True).start()
+
+    def get_ready(self, db: Session) -> Optional["AnalyticsCube"]:
+        """
+        Return the cube if it is enabled and loaded, else None so the caller
+        falls back to SQL. At most every check_interval seconds, compare the
+        rollup review total with the snapshot and reload in the background
+        when reviews were loaded since.
+        """
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            version = int(db.execute(text(VERSION_SQL)).scalar() or 0)
+            if self._data is None or self._data.version != version:
+                self.refresh_in_background()
+
+        return self if self.ready else None
+
+    def memory_footprint(self) -> Dict[str, Any]:
+        data = self._data
+        if data is None:
+            return {"rows": 0, "total_bytes": 0, "columns": {}}
+        usage = data.memory_usage()
+        return {"rows": data.n, "total_bytes": sum(usage.values()), "columns": usage}
+
+    def status(self) -> Dict[str, Any]:
+        data = self._data
+        return {
+            "enabled": self.enabled,
+            "ready": data is not None,
+            "version": data.version if data else None,
+            "loaded_at": data.loaded_at.isoformat() if data else None,
+            "load_seconds": self.last_load_seconds,
+            "memory": self.memory_footprint(),
+        }
+
+    # ---------- querying ----------
+
+    def _mask(self, data: _CubeData, category: Optional[str] = None, min_rating: Optional[int] = None,
+              start_year: Optional[int] = None, year: Optional[int] = None) -> Optional[np.ndarray]:
+        """AND the per-value bitmaps of every active filter; None means all rows"""
+        bits = None
+
+        def combine(bitmap):
+            nonlocal bits
+            bits = bitmap if bits is None else np.bitwise_and(bits, bitmap)
+
+        if category and category != "All Categories":
+            code = data.lookup("category", category)
+            if code is None:
+                return np.zeros(data.n, dtype=bool)
+            combine(data.bitmaps["category"][code])
+        if min_rating and min_rating > 0:
+            combine(data.any_of("star_rating", lambda v: v >= min_rating))
+        if start_year:
+            combine(data.any_of("year", lambda v: v >= start_year))
+        if year is not None:
+            combine(data.any_of("year", lambda v: v == year))
+
+        if bits is None:
+            return None
+        return np.unpackbits(bits, count=data.n).view(bool)
+
+    @staticmethod
+    def _group(codes: np.ndarray, size: int, data: _CubeData, mask: Optional[np.ndarray]):
+        """Vectorized GROUP BY: per-code review counts, rating sums and rated counts"""
+        ratings, rated = data.ratings, data.rated
+        if mask is not None:
+            codes, ratings, rated = codes[mask], ratings[mask], rated[mask]
+        counts = np.bincount(codes, minlength=size)
+        rating_sums = np.bincount(codes, weights=ratings, minlength=size)
+        rated_counts = np.bincount(codes, weights=rated, minlength=size)
+        return counts, rating_sums, rated_counts
+
+    def _distribution(self, data: _CubeData, dim: str, mask: Optional[np.ndarray] = None):
+        counts, rating_sums, rated_counts = self._group(data.codes[dim], len(data.values[dim]), data, mask)
+        return [
+            (data.values[dim][code], int(counts[code]),
+             float(rating_sums[code] / rated_counts[code]) if rated_counts[code] else None)
+            for code in np.flatnonzero(counts)
+        ]
+
+    def sentiment_distribution(self):
+        return [(value, count) for value, count, _ in self._distribution(self._data, "sentiment")]
+
+    def ratings_distribution(self):
+        return [(value, count) for value, count, _ in self._distribution(self._data, "star_rating")]
+
+    def category_statistics(self):
+        return [{"category": value, "count": count}
+                for value, count, _ in self._distribution(self._data, "category")]
+
+    def monthly_trends(self, year: int):
+        data = self._data
+        mask = self._mask(data, year=year)
+        rows = self._distribution(data, "month", mask)
+        rows.sort(key=lambda r: (r[0] is None, r[0]))
+        return [{"month": month, "review_count": count, "avg_rating": avg} for month, count, avg in rows]
+
+    def filtered_analytics(self, category: Optional[str] = None, min_rating: Optional[int] = None,
+                           date_range: Optional[str] = "all", top_n: int = 10) -> Dict[str, Any]:
+        data = self._data
+        mask = self._mask(data, category=category, min_rating=min_rating,
+                          start_year=crud.filter_start_year(date_range))
+
+        sentiment_dist = [(v, c) for v, c, _ in self._distribution(data, "sentiment", mask)]
+        rating_dist = [(v, c) for v, c, _ in self._distribution(data, "star_rating", mask)]
+        category_stats = self._distribution(data, "category", mask)
+
+        counts, rating_sums, rated_counts = self._group(data.title_codes, len(data.titles), data, mask)
+        top = np.argpartition(-counts, min(top_n, len(counts) - 1))[:top_n] if len(counts) else []
+        top = sorted((code for code in top if counts[code]), key=lambda code: -counts[code])
+        top_products = [
+            (data.titles[code], int(counts[code]),
+             rating_sums[code] / rated_counts[code] if rated_counts[code] else None)
+            for code in top
+        ]
+
+        total_reviews = int(mask.sum()) if mask is not None else data.n
+        rated = data.rated if mask is None else data.rated[mask]
+        ratings = data.ratings if mask is None else data.ratings[mask]
+        average_rating = float(ratings.sum() / rated.sum()) if rated.any() else None
+
+        return crud.format_filtered_analytics(
+            sentiment_dist, rating_dist, category_stats, top_products, total_reviews, average_rating
+        )
+
+
+# Create global instance
+analytics_cube = AnalyticsCube()
@@ -0,0 +1,121 @@
+# ============================================
+# Bulkheads for heavy routes
+# ============================================
+# File: server_py/bulkhead.py
+#
+# Each bulkhead caps how many requests of one kind run at once and how many
+# may queue for a slot. Sync work runs on the bulkhead's own thread pool
+# rather than Starlette's shared one, so LLM calls, bcrypt, RapidAPI syncs
+# and heavy analytics cannot starve /health and the cheap lookups.
+#
+# Overflow:
+#   queue full                    -> 429 Too Many Requests
+#   no slot within queue_timeout  -> 503 Service Unavailable
+#
+# Limits per bulkhead: BULKHEAD_<NAME>_CONCURRENCY, BULKHEAD_<NAME>_QUEUE,
+# BULKHEAD_<NAME>_TIMEOUT (seconds).
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException
+
+from .pool_metrics import WaitStats
+
+
+class Bulkhead:
+    """Bounded concurrency plus a bounded wait queue for one class of routes"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        prefix = f"BULKHEAD_{name.upper()}_"
+        self.name = name
+        self.max_concurrent = int(os.getenv(prefix + "CONCURRENCY", str(max_concurrent)))
+        self.max_queue = int(os.getenv(prefix + "QUEUE", str(max_queue)))
+        self.queue_timeout = float(os.getenv(prefix + "TIMEOUT", str(queue_timeout)))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix=f"bulkhead-{name}")
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self.active = self.queued = 0
+        self.admitted = self.rejected_full = self.rejected_timeout = 0
+        self.waits = WaitStats()
+
+    def _reject(self, status_code: int, reason: str) -> HTTPException:
+        return HTTPException(
+            status_code=status_code,
+            detail=f"{self.name} is busy: {reason}, try again shortly",
+            headers={"Retry-After": str(max(1, round(self.queue_timeout)))},
+        )
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the bounded queue; raises 429/503 on overflow"""
+        started = time.perf_counter()
+        if not self._slots.locked():
+            # Free slot: taken without suspending, so the counters stay exact
+            await self._slots.acquire()
+        elif self.queued >= self.max_queue:
+            self.rejected_full += 1
+            raise self._reject(429, f"{self.queued} requests already queued")
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise self._reject(503, f"no capacity within {self.queue_timeout:g}s")
+            finally:
+                self.queued -= 1
+        self.waits.record(time.perf_counter() - started)
+        self.active += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run blocking fn(*args, **kwargs) on this bulkhead's threads"""
+        async with self.slot():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "active": self.active,
+            "queue_depth": self.queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "queue_wait": self.waits.snapshot(),
+        }
+
+
+# name -> Bulkhead(name, max_concurrent, max_queue, queue_timeout)
+bulkheads: Dict[str, Bulkhead] = {
+    # Local LLM generation (/ai/query)
+    "llm": Bulkhead("llm", max_concurrent=2, max_queue=16, queue_timeout=30),
+    # bcrypt password hashing (/users/signup)
+    "auth": Bulkhead("auth", max_concurrent=4, max_queue=32, queue_timeout=10),
+    # RapidAPI connection checks (/sync/test-api); syncs themselves run in the scheduler worker
+    "sync": Bulkhead("sync", max_concurrent=2, max_queue=4, queue_timeout=5),
+    # Uncached filtered analytics queries
+    "analytics": Bulkhead("analytics", max_concurrent=8, max_queue=64, queue_timeout=15),
+}
+
+
+def bulkhead_status() -> Dict[str, Any]:
+    return {name: bulkhead.stats() for name, bulkhead in bulkheads.items()}
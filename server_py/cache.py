@@ -0,0 +1,272 @@
+# ============================================
+# Result cache for read-only crud functions
+# ============================================
+# File: server_py/cache.py
+#
+# Tier 1 is a bounded in-process LRU with TTL. Tier 2 is an optional SQLite
+# file (RESULT_CACHE_SQLITE_PATH) shared by every uvicorn worker on the host.
+# Cache keys include the data_versions counter of each table a function reads,
+# and the write paths bump those counters in their own transaction, so a
+# write makes older entries unreachable as soon as it commits.
+
+import functools
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+BUMP_VERSION_SQL = text("""
+INSERT INTO data_versions (table_name, version, updated_at)
+VALUES (:table_name, 1, now())
+ON CONFLICT (table_name)
+DO UPDATE SET version = data_versions.version + 1, updated_at = now()
+""")
+
+SELECT_VERSIONS_SQL = text(
+    "SELECT table_name, version FROM data_versions WHERE table_name IN :tables"
+).bindparams(bindparam("tables", expanding=True))
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU with a per-entry TTL"""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def drop_table(self, table: str) -> int:
+        """Remove every entry whose key was built from the given table"""
+        marker = f"|{table}="
+        with self._lock:
+            stale = [key for key in self._data if marker in key]
+            for key in stale:
+                del self._data[key]
+            self.evictions += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteBackend:
+    """Shared on-host tier: pickled results in a WAL-mode SQLite file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self.hits = self.misses = self.errors = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value BLOB NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Any:
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM results WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Shared cache read failed: {e}")
+            return _MISSING
+        if row is None:
+            self.misses += 1
+            return _MISSING
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, time.time() + ttl, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+            )
+            conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM results")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+class DataVersions:
+    """
+    Reads data_versions counters, memoized per process for a short window so a
+    cached call costs at most one primary-key lookup per window. Commits that
+    bumped a table clear its memo immediately (see the after_commit hook).
+    """
+
+    def __init__(self, memo_seconds: float = 1.0):
+        self.memo_seconds = memo_seconds
+        self._memo: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self.on_change: Callable[[str], None] = lambda table: None
+
+    def get(self, db: Session, tables: Iterable[str]) -> Dict[str, int]:
+        now = time.monotonic()
+        tables = list(tables)
+        with self._lock:
+            result = {t: self._memo[t][1] for t in tables
+                      if t in self._memo and now - self._memo[t][0] < self.memo_seconds}
+        missing = [t for t in tables if t not in result]
+        if missing:
+            rows = dict(db.execute(SELECT_VERSIONS_SQL, {"tables": missing}).all())
+            with self._lock:
+                for table in missing:
+                    version = int(rows.get(table, 0))
+                    previous = self._memo.get(table)
+                    if previous is not None and previous[1] != version:
+                        self.on_change(table)
+                    self._memo[table] = (now, version)
+                    result[table] = version
+        return result
+
+    def forget(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            for table in tables:
+                self._memo.pop(table, None)
+
+
+def bump_version(db: Session, *tables: str) -> None:
+    """
+    Increment the data_versions counter of each table inside the caller's
+    transaction. Call from write paths before commit.
+    """
+    for table in tables:
+        db.execute(BUMP_VERSION_SQL, {"table_name": table})
+    db.info.setdefault("bumped_tables", set()).update(tables)
+
+
+class ResultCache:
+    """Two-tier cache for crud functions of the form f(db, *args, **kwargs)"""
+
+    def __init__(self):
+        self.local = LRUCache(
+            maxsize=int(os.getenv("RESULT_CACHE_MAXSIZE", "512")),
+            ttl=float(os.getenv("RESULT_CACHE_TTL", "300")),
+        )
+        shared_path = os.getenv("RESULT_CACHE_SQLITE_PATH")
+        self.shared = SQLiteBackend(shared_path) if shared_path else None
+        self.versions = DataVersions(float(os.getenv("RESULT_CACHE_VERSION_MEMO", "1.0")))
+        self.versions.on_change = self.local.drop_table
+
+    def make_key(self, name: str, args: tuple, kwargs: dict, versions: Dict[str, int]) -> str:
+        version_part = "".join(f"|{table}={version}" for table, version in sorted(versions.items()))
+        return f"{name}:{args!r}:{sorted(kwargs.items())!r}{version_part}"
+
+    def cached(self, *tables: str, ttl: Optional[float] = None):
+        """Decorator: cache a read-only crud function keyed by its args and table versions"""
+        def decorator(func):
+            name = f"{func.__module__}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            def wrapper(db: Session, *args, **kwargs):
+                key = self.make_key(name, args, kwargs, self.versions.get(db, tables))
+
+                value = self.local.get(key)
+                if value is not _MISSING:
+                    return value
+                if self.shared is not None:
+                    value = self.shared.get(key)
+                    if value is not _MISSING:
+                        self.local.set(key, value, ttl)
+                        return value
+
+                value = func(db, *args, **kwargs)
+                self.local.set(key, value, ttl)
+                if self.shared is not None:
+                    self.shared.set(key, value, ttl or self.local.ttl)
+                return value
+
+            wrapper.uncached = func
+            return wrapper
+        return decorator
+
+    def clear(self) -> None:
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+# Create global instance
+result_cache = ResultCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_bumped_versions(session: Session) -> None:
+    tables = session.info.pop("bumped_tables", None)
+    if tables:
+        result_cache.versions.forget(tables)
+        for table in tables:
+            result_cache.local.drop_table(table)
@@ -0,0 +1,180 @@
+# ============================================
+# Multi-page category crawler with resumable checkpoints
+# ============================================
+# File: server_py/category_crawler.py
+#
+# Crawls categories x pages as a source of the sync pipeline (sync_pipeline.py).
+# SYNC_CRAWL_WINDOW pages per category are in flight at once; as each page is
+# written (in page order), the next one is submitted. A category stops at the
+# first page that:
+#   - fails,
+#   - returns no results, or
+#   - adds no new or changed products (the rest of the listing is already known),
+# or after SYNC_CRAWL_MAX_PAGES pages.
+#
+# After each saved page, the category's progress (last page, cursor, counts) is
+# written to sync_runs. If a run is interrupted, or a category fails, the next
+# crawl within SYNC_CRAWL_RESUME_HOURS continues that run from the next page
+# instead of starting over. A category whose next page has failed
+# SYNC_CRAWL_MAX_ATTEMPTS times in a row is marked "failed" and no longer keeps
+# the run open, so the next crawl starts a fresh run for every category.
+
+import asyncio
+import functools
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from server_py import models
+from server_py.database_config import SessionLocal
+from server_py.sync_pipeline import FetchJob, SyncPipeline
+
+logger = logging.getLogger(__name__)
+
+SYNC_CRAWL_MAX_PAGES = int(os.getenv("SYNC_CRAWL_MAX_PAGES", "20"))
+SYNC_CRAWL_WINDOW = int(os.getenv("SYNC_CRAWL_WINDOW", "2"))
+SYNC_CRAWL_RESUME_HOURS = float(os.getenv("SYNC_CRAWL_RESUME_HOURS", "24"))
+SYNC_CRAWL_MAX_ATTEMPTS = int(os.getenv("SYNC_CRAWL_MAX_ATTEMPTS", "3"))
+
+# Response keys that may carry a pagination token
+CURSOR_KEYS = ("next_cursor", "cursor", "next_page_token")
+
+
+class CategoryCrawler:
+    """
+    normalize(category, results) maps one page of API results to product rows.
+    seed() opens the checkpoints and returns the first jobs; finish() reports.
+    """
+
+    def __init__(self, normalize: Callable[[str, List[Dict]], List[dict]]):
+        self.normalize = normalize
+        self.db = None
+
+    def resumable_run(self, db) -> Optional[str]:
+        """run_id of the latest unfinished run still inside the resume window"""
+        cutoff = datetime.utcnow() - timedelta(hours=SYNC_CRAWL_RESUME_HOURS)
+        row = (
+            db.query(models.SyncRun.run_id)
+            .filter(models.SyncRun.status == "running", models.SyncRun.updated_at >= cutoff)
+            .order_by(models.SyncRun.updated_at.desc())
+            .first()
+        )
+        return row.run_id if row else None
+
+    def load_checkpoints(self, db, run_id: str, categories: List[str]) -> Dict[str, models.SyncRun]:
+        existing = {
+            row.category: row
+            for row in db.query(models.SyncRun).filter(models.SyncRun.run_id == run_id)
+        }
+        for category in categories:
+            if category not in existing:
+                existing[category] = models.SyncRun(
+                    run_id=run_id, category=category, last_page=0, status="running", attempts=0, items=0, new_items=0
+                )
+                db.add(existing[category])
+        db.commit()
+        return existing
+
+    def seed(self, pipeline: SyncPipeline, categories: List[str],
+             max_pages: int = SYNC_CRAWL_MAX_PAGES) -> List[FetchJob]:
+        """Open (or resume) a run; returns the first window of page jobs for each category"""
+        self.db = SessionLocal()
+        self.pipeline = pipeline
+        self.categories = categories
+        self.max_pages = max_pages
+        self.jobs = 0
+        self._written: Dict[str, Dict[int, Dict[str, Any]]] = {category: {} for category in categories}
+        self._cursors: Dict[tuple, Optional[str]] = {}
+        # Serializes checkpoints: they share self.db and run on worker threads
+        self._checkpoint_lock = asyncio.Lock()
+
+        run_id = self.resumable_run(self.db)
+        self.resumed = run_id is not None
+        self.run_id = run_id or uuid.uuid4().hex
+        self.checkpoints = self.load_checkpoints(self.db, self.run_id, categories)
+        active = []
+        for category in categories:
+            checkpoint = self.checkpoints[category]
+            if checkpoint.status == "running" and checkpoint.last_page < max_pages:
+                active.append(category)
+            elif checkpoint.status == "running":
+                checkpoint.status = "done"
+        self.db.commit()
+        logger.info(f"Crawl {self.run_id} ({'resumed' if self.resumed else 'new'}): {len(active)} categories to crawl")
+
+        self._next_page = {category: self.checkpoints[category].last_page + 1 for category in active}
+        return [job for category in active for job in (self._next_job(category) for _ in range(SYNC_CRAWL_WINDOW)) if job]
+
+    def _next_job(self, category: str) -> Optional[FetchJob]:
+        page = self._next_page[category]
+        if page > self.max_pages:
+            return None
+        self._next_page[category] = page + 1
+        self.jobs += 1
+        return FetchJob("amazon_category", "get_amazon_category_products", (category, page),
+                        functools.partial(self._normalize_page, category, page), self._on_written)
+
+    def _normalize_page(self, category: str, page: int, data: Dict):
+        self._cursors[(category, page)] = next((str(data[key]) for key in CURSOR_KEYS if data.get(key)), None)
+        return self.normalize(category, data.get("results", [])), []
+
+    async def _on_written(self, job: FetchJob, counts: Dict[str, Any]) -> None:
+        """Checkpoint pages in order; submit the next page while the category keeps yielding"""
+        category, page = job.args
+        checkpoint = self.checkpoints[category]
+        pending = self._written[category]
+        pending[page] = counts
+        async with self._checkpoint_lock:
+            while checkpoint.status == "running" and checkpoint.last_page + 1 in pending:
+                page = checkpoint.last_page + 1
+                # The checkpoint commit blocks on the database; keep it off the event loop
+                if not await asyncio.to_thread(self._checkpoint, checkpoint, page, pending.pop(page)):
+                    break
+                next_job = self._next_job(category)
+                if next_job:
+                    self.pipeline.submit(next_job)
+
+    def _checkpoint(self, checkpoint: models.SyncRun, page: int, counts: Dict[str, Any]) -> bool:
+        """Record one saved page; returns False when the category should stop"""
+        if counts.get("error"):
+            # Stop without advancing; the next crawl retries this page until the attempts run out
+            self._next_page[checkpoint.category] = self.max_pages + 1
+            checkpoint.attempts += 1
+            if checkpoint.attempts >= SYNC_CRAWL_MAX_ATTEMPTS:
+                checkpoint.status = "failed"
+            self.db.commit()
+            logger.warning(f"Crawl {checkpoint.category} page {page} failed "
+                           f"(attempt {checkpoint.attempts}/{SYNC_CRAWL_MAX_ATTEMPTS}): {counts['error']}")
+            return False
+
+        items = counts.get("items", 0)
+        fresh = counts.get("new", 0) + counts.get("changed", 0)
+        checkpoint.last_page = page
+        checkpoint.attempts = 0
+        checkpoint.cursor = self._cursors.pop((checkpoint.category, page), None)
+        checkpoint.items += items
+        checkpoint.new_items += fresh
+        if not items or not fresh or page >= self.max_pages:
+            checkpoint.status = "done"
+        self.db.commit()
+        logger.info(f"Crawl {checkpoint.category} page {page}: {items} items, {fresh} new/changed")
+        return checkpoint.status == "running"
+
+    def finish(self) -> Dict[str, Any]:
+        """Close the checkpoint session and summarize the run"""
+        try:
+            status = {c: self.checkpoints[c].status for c in self.categories}
+            return {
+                "run_id": self.run_id,
+                "resumed": self.resumed,
+                "pages": self.jobs,
+                "products": sum(self.checkpoints[c].items for c in self.categories),
+                "new_items": sum(self.checkpoints[c].new_items for c in self.categories),
+                "complete": all(s == "done" for s in status.values()),
+                "categories": {c: {"last_page": self.checkpoints[c].last_page, "status": status[c]}
+                               for c in self.categories},
+            }
+        finally:
+            self.db.close()
@@ -1,12 +1,26 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
+    # Required: set in the environment or .env
     DATABASE_URL: str
     SECRET_KEY: str
-    Gemini_API_KEY: str
+    Gemini_API_KEY: Optional[str] = None
+
+    # Connection pool (applies to both the sync and the async engine)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    # SQLAlchemy compiled-statement cache, and asyncpg's prepared statement cache
+    DB_QUERY_CACHE_SIZE: int = 500
+    DB_STATEMENT_CACHE_SIZE: int = 100
 
     class Config:
         env_file = ".env"
+        extra = "ignore"
 
 
 settings = Settings()
@@ -1,62 +1,169 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
-from . import models
+from sqlalchemy import func, or_, cast, tuple_, BigInteger
+from . import models, rollups
+from .cache import result_cache
 from sqlalchemy import text
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import base64
+import json
+from datetime import datetime
 import pandas as pd
 import numpy as np
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-from sklearn.preprocessing import MinMaxScaler
 
 
 def get_reviews(db: Session, limit: int = 50, offset: int = 0):
     return db.query(models.AmazonReview).offset(offset).limit(limit).all()
 
+# --------------------------
+# Keyset (cursor) pagination
+# --------------------------
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode the last seen sort key as an opaque, URL-safe token"""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a token produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict) or "review_id" not in values:
+        raise ValueError("Invalid cursor")
+    return values
+
+def _review_keyset_page(query, limit: int, cursor: Optional[str] = None,
+                        offset: int = 0) -> Tuple[list, Optional[str]]:
+    """
+    Page a review query in review_id order. With a cursor the page starts right
+    after the last seen key, so its cost depends on the page size only.
+    One extra row is fetched to know whether a next page exists.
+    """
+    if cursor:
+        last_id = decode_cursor(cursor)["review_id"]
+        query = query.filter(models.AmazonReview.review_id > last_id)
+    elif offset:
+        query = query.offset(offset)
+
+    rows = query.order_by(models.AmazonReview.review_id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({"review_id": rows[-1].review_id})
+    return rows, next_cursor
+
+def get_reviews_page(db: Session, limit: int = 50, cursor: Optional[str] = None, offset: int = 0):
+    """Get one page of reviews plus the cursor for the next page"""
+    return _review_keyset_page(db.query(models.AmazonReview), limit, cursor, offset)
+
+def get_product_reviews_page(db: Session, product_id: str, limit: int = 20, cursor: Optional[str] = None):
+    """Get one page of a product's reviews plus the cursor for the next page"""
+    query = db.query(models.AmazonReview).filter(models.AmazonReview.product_id == product_id)
+    return _review_keyset_page(query, limit, cursor)
+
 def get_review_by_id(db: Session, review_id: str):
     return db.query(models.AmazonReview).filter(models.AmazonReview.review_id == review_id).first()
 
 def get_product_reviews(db: Session, product_id: str, limit: int = 20):
     return db.query(models.AmazonReview).filter(models.AmazonReview.product_id == product_id).limit(limit).all()
 
-def search_reviews(db: Session, query: str, limit: int = 50):
-    return db.query(models.AmazonReview).filter(
-        or_(
-            models.AmazonReview.product_title.ilike(f"%{query}%"),
-            models.AmazonReview.review_headline.ilike(f"%{query}%"),
-            models.AmazonReview.review_body.ilike(f"%{query}%")
-        )
-    ).limit(limit).all()
+# --------------------------
+# Full-text search
+# --------------------------
+SEARCH_RANK_WEIGHTS = "{0.1, 0.2, 0.4, 1.0}"  # D, C, B, A
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10"
+
+def search_reviews(db: Session, query: str, limit: int = 50, offset: int = 0):
+    """
+    Ranked full-text search over the GIN-indexed search_vector column.
+    Returns (review, rank, snippet) rows plus the offset of the next page.
+    Snippets are only built for the rows on the requested page.
+    """
+    tsq = func.websearch_to_tsquery(models.SEARCH_CONFIG, query)
+    rank = func.ts_rank_cd(text(f"'{SEARCH_RANK_WEIGHTS}'"), models.AmazonReview.search_vector, tsq)
 
+    hits = (
+        db.query(models.AmazonReview.review_id.label("review_id"), rank.label("rank"))
+          .filter(models.AmazonReview.search_vector.op("@@")(tsq))
+          .order_by(rank.desc(), models.AmazonReview.review_id)
+          .offset(offset)
+          .limit(limit + 1)
+          .subquery()
+    )
+    snippet = func.ts_headline(
+        models.SEARCH_CONFIG,
+        func.concat_ws(" ... ", models.AmazonReview.review_headline, models.AmazonReview.review_body),
+        tsq,
+        SEARCH_HEADLINE_OPTIONS,
+    )
+    rows = (
+        db.query(models.AmazonReview, hits.c.rank, snippet.label("snippet"))
+          .join(hits, hits.c.review_id == models.AmazonReview.review_id)
+          .order_by(hits.c.rank.desc(), models.AmazonReview.review_id)
+          .all()
+    )
+
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+    return rows, next_offset
+
+# --------------------------
+# Distributions (served from review_rollups)
+# --------------------------
+def _rollup_sum(column, where=None):
+    total = func.sum(column)
+    if where is not None:
+        total = total.filter(where)
+    return cast(func.coalesce(total, 0), BigInteger)
+
+@result_cache.cached("Amazon_Reviews")
 def get_review_statistics(db: Session):
-    total = db.query(func.count(models.AmazonReview.review_id)).scalar()
-    avg_rating = db.query(func.avg(models.AmazonReview.star_rating)).scalar()
+    rated = models.ReviewRollup.star_rating != rollups.NO_INT
+    total, rating_sum, rated_count = db.query(
+        _rollup_sum(models.ReviewRollup.review_count),
+        _rollup_sum(models.ReviewRollup.rating_sum),
+        _rollup_sum(models.ReviewRollup.review_count, where=rated),
+    ).one()
+    avg_rating = rating_sum / rated_count if rated_count else None
     return {"total_reviews": total, "average_rating": float(avg_rating) if avg_rating else None}
 
+@result_cache.cached("Amazon_Reviews")
 def get_sentiment_distribution(db: Session):
-    return (
-        db.query(models.AmazonReview.Sentiment_pc, func.count(models.AmazonReview.review_id))
-          .group_by(models.AmazonReview.Sentiment_pc)
+    sentiment = func.nullif(models.ReviewRollup.sentiment, rollups.NO_TEXT)
+    results = (
+        db.query(sentiment, _rollup_sum(models.ReviewRollup.review_count))
+          .group_by(sentiment)
           .all()
     )
+    return [tuple(row) for row in results]
 
+@result_cache.cached("Amazon_Reviews")
 def get_ratings_distribution(db: Session):
-    return (
-        db.query(models.AmazonReview.star_rating, func.count(models.AmazonReview.review_id))
-          .group_by(models.AmazonReview.star_rating)
+    rating = func.nullif(models.ReviewRollup.star_rating, rollups.NO_INT)
+    results = (
+        db.query(rating, _rollup_sum(models.ReviewRollup.review_count))
+          .group_by(rating)
           .all()
     )
+    return [tuple(row) for row in results]
 
+@result_cache.cached("Amazon_Reviews")
 def get_category_statistics(db: Session):
+    category = func.nullif(models.ReviewRollup.category, rollups.NO_TEXT)
     results = (
-        db.query(models.AmazonReview.product_category, func.count(models.AmazonReview.review_id))
-          .group_by(models.AmazonReview.product_category)
+        db.query(category, _rollup_sum(models.ReviewRollup.review_count))
+          .group_by(category)
           .all()
     )
     return [{"category": category, "count": count} for category, count in results]
 
 from sqlalchemy import func
 
+@result_cache.cached("Amazon_Reviews")
 def get_trending_products(db: Session, limit: int = 10):
     results = (
         db.query(
@@ -87,6 +194,7 @@ def get_trending_products(db: Session, limit: int = 10):
         for pid, title, cat, rc, avg in results
     ]
 
+@result_cache.cached("Amazon_Reviews")
 def get_monthly_trends(db: Session, year: int):
     results = (
         db.query(
@@ -108,6 +216,7 @@ def get_monthly_trends(db: Session, year: int):
 def get_helpful_reviews(db: Session, limit: int = 10):
     return db.query(models.AmazonReview).order_by(models.AmazonReview.helpful_votes.desc()).limit(limit).all()
 
+@result_cache.cached("Amazon_Reviews")
 def get_product_sentiment_breakdown(db: Session, product_id: str):
     results = (
         db.query(
@@ -123,6 +232,7 @@ def get_product_sentiment_breakdown(db: Session, product_id: str):
     return [{"sentiment": sentiment, "count": count} for sentiment, count in results]
 
 
+@result_cache.cached("products")
 def get_products(db: Session, limit: int, offset: int, category: str = None,
                  min_price: float = None, max_price: float = None) -> List[Dict[str, Any]]:
     query = "SELECT * FROM products WHERE 1=1"
@@ -145,6 +255,7 @@ def get_products(db: Session, limit: int, offset: int, category: str = None,
     return [dict(row._mapping) for row in result]
 
 # Analytics summary
+@result_cache.cached("products")
 def get_summary(db: Session) -> Dict[str, Any]:
     query = """
     SELECT
@@ -167,6 +278,7 @@ def get_summary(db: Session) -> Dict[str, Any]:
 def get_top_products(db: Session, n: int):
     return db.query(models.Product).order_by(models.Product.rating.desc()).limit(n).all()
 
+@result_cache.cached("Amazon_Reviews")
 def get_top_products_amazon(db: Session, n: int):
     """
     Get top N products by number of reviews with average rating
@@ -188,6 +300,7 @@ def get_top_products_amazon(db: Session, n: int):
 
 
 # Category analytics
+@result_cache.cached("products")
 def get_category_analytics(db: Session) -> List[Dict[str, Any]]:
     query = """
     SELECT
@@ -203,6 +316,143 @@ def get_category_analytics(db: Session) -> List[Dict[str, Any]]:
     result = db.execute(text(query))
     return [dict(row._mapping) for row in result]
 
+# --------------------------
+# Filtered analytics
+# --------------------------
+def filtered_review_conditions(category: Optional[str] = None, min_rating: Optional[int] = None,
+                               date_range: Optional[str] = "all") -> list:
+    """Translate the dashboard filter panel into Amazon_Reviews WHERE conditions"""
+    conditions = []
+    if category and category != "All Categories":
+        conditions.append(models.AmazonReview.product_category == category)
+
+    if min_rating and min_rating > 0:
+        conditions.append(models.AmazonReview.star_rating >= min_rating)
+
+    start_year = filter_start_year(date_range)
+    if start_year:
+        conditions.append(models.AmazonReview.review_year >= start_year)
+    return conditions
+
+def filter_start_year(date_range: Optional[str]) -> Optional[int]:
+    """Date range filter - reviews only carry a year, so this is an approximation"""
+    if not date_range or date_range == "all":
+        return None
+    today = datetime.now()
+    if date_range in ("7d", "30d", "90d"):
+        return today.year
+    if date_range == "1y":
+        return today.year - 1
+    return None
+
+def format_filtered_analytics(sentiment_dist, rating_dist, category_stats, top_products,
+                               total_reviews, average_rating) -> Dict[str, Any]:
+    return {
+        "sentiment_distribution": [
+            {"sentiment": s[0], "count": s[1]} for s in sentiment_dist
+        ],
+        "rating_distribution": [
+            {"rating": r[0], "count": r[1]} for r in rating_dist
+        ],
+        "category_stats": [
+            {
+                "category": c[0],
+                "count": c[1],
+                "avg_rating": float(c[2]) if c[2] else 0
+            } for c in category_stats
+        ],
+        "top_products": [
+            {
+                "product_title": p[0],
+                "review_count": p[1],
+                "avg_rating": float(p[2]) if p[2] else 0
+            } for p in top_products
+        ],
+        "total_reviews": total_reviews,
+        "average_rating": float(average_rating or 0)
+    }
+
+def get_filtered_analytics_multi(db: Session, conditions: list, top_n: int = 10) -> Dict[str, Any]:
+    """Original execution: one query per chart, each scanning the filtered rows again"""
+    R = models.AmazonReview
+    query = db.query(R).filter(*conditions)
+
+    sentiment_dist = query.with_entities(
+        R.Sentiment_pc, func.count(R.review_id).label('count')
+    ).group_by(R.Sentiment_pc).all()
+
+    rating_dist = query.with_entities(
+        R.star_rating, func.count(R.review_id).label('count')
+    ).group_by(R.star_rating).all()
+
+    category_stats = query.with_entities(
+        R.product_category, func.count(R.review_id).label('count'), func.avg(R.star_rating).label('avg_rating')
+    ).group_by(R.product_category).all()
+
+    top_products = query.with_entities(
+        R.product_title, func.count(R.review_id).label('review_count'), func.avg(R.star_rating).label('avg_rating')
+    ).group_by(R.product_title).order_by(func.count(R.review_id).desc()).limit(top_n).all()
+
+    return format_filtered_analytics(
+        sentiment_dist, rating_dist, category_stats, top_products,
+        query.count(), query.with_entities(func.avg(R.star_rating)).scalar()
+    )
+
+# GROUPING() bitmask per grouping set; a bit is set when that column is NOT grouped
+_GROUP_SENTIMENT = 0b0111
+_GROUP_RATING = 0b1011
+_GROUP_CATEGORY = 0b1101
+_GROUP_TITLE = 0b1110
+
+def get_filtered_analytics_single_pass(db: Session, conditions: list, top_n: int = 10) -> Dict[str, Any]:
+    """
+    Compute every chart of the filtered dashboard in one round trip: a single
+    GROUPING SETS scan over the filtered rows, with the top products cut to
+    top_n by a window function before anything is sent back. The total count
+    and the average rating are derived from the rating distribution.
+    """
+    R = models.AmazonReview
+    dims = (R.Sentiment_pc, R.star_rating, R.product_category, R.product_title)
+    grouped = (
+        db.query(
+            func.grouping(*dims).label("grp"),
+            *[d.label(d.key) for d in dims],
+            func.count(R.review_id).label("review_count"),
+            func.avg(R.star_rating).label("avg_rating"),
+        )
+        .filter(*conditions)
+        .group_by(func.grouping_sets(*[tuple_(d) for d in dims]))
+        .subquery()
+    )
+    rn = func.row_number().over(partition_by=grouped.c.grp, order_by=grouped.c.review_count.desc()).label("rn")
+    ranked = db.query(grouped, rn).subquery()
+    rows = (
+        db.query(ranked)
+          .filter(or_(ranked.c.grp != _GROUP_TITLE, ranked.c.rn <= top_n))
+          .order_by(ranked.c.grp, ranked.c.rn)
+          .all()
+    )
+
+    sentiment_dist, rating_dist, category_stats, top_products = [], [], [], []
+    for row in rows:
+        if row.grp == _GROUP_SENTIMENT:
+            sentiment_dist.append((row.Sentiment_pc, row.review_count))
+        elif row.grp == _GROUP_RATING:
+            rating_dist.append((row.star_rating, row.review_count))
+        elif row.grp == _GROUP_CATEGORY:
+            category_stats.append((row.product_category, row.review_count, row.avg_rating))
+        elif row.grp == _GROUP_TITLE:
+            top_products.append((row.product_title, row.review_count, row.avg_rating))
+
+    total_reviews = sum(count for _, count in rating_dist)
+    rated = [(rating, count) for rating, count in rating_dist if rating is not None]
+    rated_count = sum(count for _, count in rated)
+    average_rating = sum(rating * count for rating, count in rated) / rated_count if rated_count else None
+
+    return format_filtered_analytics(
+        sentiment_dist, rating_dist, category_stats, top_products, total_reviews, average_rating
+    )
+
 def get_filters(db: Session):
     query = db.execute("SELECT DISTINCT category, brand FROM amazon_reviews")
     results = query.fetchall()
@@ -211,58 +461,162 @@ def get_filters(db: Session):
         filters.append(dict(row._mapping))  
     return filters
 
+def get_filter_options(db: Session) -> Dict[str, Any]:
+    """
+    Get available filter options (categories, ratings, price range)
+    """
+    # Get unique categories from Amazon_Reviews
+    categories_query = db.query(models.AmazonReview.product_category)\
+        .distinct()\
+        .filter(models.AmazonReview.product_category.isnot(None))\
+        .filter(models.AmazonReview.product_category != '')\
+        .all()
+    category_list = sorted([cat[0] for cat in categories_query if cat[0]])
+
+    # Get unique star ratings from Amazon_Reviews
+    ratings_query = db.query(models.AmazonReview.star_rating)\
+        .distinct()\
+        .filter(models.AmazonReview.star_rating.isnot(None))\
+        .order_by(models.AmazonReview.star_rating)\
+        .all()
+    rating_list = sorted([int(r[0]) for r in ratings_query if r[0] and r[0] > 0])
+
+    # Get price range from products table
+    price_stats = db.query(
+        func.min(models.Product.price).label('min_price'),
+        func.max(models.Product.price).label('max_price')
+    ).filter(models.Product.price.isnot(None)).first()
+
+    min_price = float(price_stats.min_price) if price_stats and price_stats.min_price else 0
+    max_price = float(price_stats.max_price) if price_stats and price_stats.max_price else 100000
+
+    return {
+        "categories": category_list,
+        "ratings": rating_list,
+        "price_range": {
+            "min": int(min_price),
+            "max": int(max_price)
+        }
+    }
+
 def forecast_next_price(df: pd.DataFrame, look_back=5, epochs=50) -> float:
     """
     df: pandas dataframe with 'price' column sorted by date
     Returns forecasted next price
     """
-    if len(df) < look_back:
-        return df['price'].iloc[-1]  # fallback if not enough data
- 
-    scaler = MinMaxScaler()
-    prices = scaler.fit_transform(df['price'].values.reshape(-1,1))
- 
-    X, y = [], []
-    for i in range(look_back, len(prices)):
-        X.append(prices[i-look_back:i,0])
-        y.append(prices[i,0])
- 
-    X, y = np.array(X), np.array(y)
-    X = X.reshape(X.shape[0], X.shape[1], 1)
- 
-    model = Sequential()
-    model.add(LSTM(50, return_sequences=True, input_shape=(X.shape[1],1)))
-    model.add(LSTM(50))
-    model.add(Dense(1))
-    model.compile(optimizer='adam', loss='mean_squared_error')
-    model.fit(X, y, epochs=epochs, batch_size=16, verbose=0)
- 
-    last_sequence = X[-1]
-    next_price = model.predict(last_sequence.reshape(1, look_back,1), verbose=0)
-    next_price = scaler.inverse_transform(next_price.reshape(-1,1))[0,0]
-    return float(next_price)
- 
+    from .lstm_model import fit_price_lstm  # TensorFlow loads on first use only
+
+    next_price, _, _ = fit_price_lstm(df['price'].values, look_back=look_back, epochs=epochs)
+    return next_price
+
+@result_cache.cached("product_price_history")
+def get_price_history(db: Session, product_id: str, bucket: str = "day",
+                      start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    A product's price history: raw change points (bucket='raw') or daily/weekly
+    min/avg/max/close from product_price_rollups. Both are index range scans.
+    """
+    if bucket == "raw":
+        H = models.ProductPriceHistory
+        query = db.query(H).filter(H.product_id == product_id)
+        if start:
+            query = query.filter(H.observed_at >= start)
+        if end:
+            query = query.filter(H.observed_at < end)
+        return [
+            {"observed_at": row.observed_at.isoformat(), "price": row.price, "currency": row.currency}
+            for row in query.order_by(H.observed_at).all()
+        ]
+
+    R = models.ProductPriceRollup
+    query = db.query(R).filter(R.product_id == product_id, R.bucket == bucket)
+    if start:
+        query = query.filter(R.bucket_start >= start.date())
+    if end:
+        query = query.filter(R.bucket_start < end.date())
+    return [
+        {
+            "bucket_start": row.bucket_start.isoformat(),
+            "min_price": row.min_price,
+            "avg_price": row.price_sum / row.samples,
+            "max_price": row.max_price,
+            "close_price": row.last_price,
+            "samples": row.samples,
+        }
+        for row in query.order_by(R.bucket_start).all()
+    ]
+
+@result_cache.cached("product_forecasts")
 def get_top_forecasted_products(db: Session, n: int = 10) -> list:
     """
-    Fetch all products from DB, forecast next price per product using LSTM,
-    return top N products by forecasted price
+    Top N products by forecasted next price, precomputed by
+    server_py/forecasting.py (indexed ORDER BY forecast_price DESC LIMIT n)
     """
-    # Get all products and their historical prices
-    query = "SELECT id, title, price, last_updated as date FROM products ORDER BY id, last_updated"
-    df = pd.read_sql(query, db.bind)
- 
-    forecast_list = []
-    for product_id, group in df.groupby('id'):
-        group = group.sort_values('date')
-        forecast_price = forecast_next_price(group)
-        forecast_list.append({
-            "product_id": product_id,
-            "title": group['title'].iloc[0],
-            "forecast_price": forecast_price,
-            "currency": "₹"
-        })
- 
-    # Sort descending and take top N
-    forecast_list = sorted(forecast_list, key=lambda x: x['forecast_price'], reverse=True)[:n]
- 
-    return forecast_list
+    rows = (
+        db.query(models.ProductForecast)
+          .order_by(models.ProductForecast.forecast_price.desc())
+          .limit(n)
+          .all()
+    )
+    return [
+        {
+            "product_id": row.product_id,
+            "title": row.title,
+            "forecast_price": row.forecast_price,
+            "currency": row.currency,
+            "model": row.model,
+            "generated_at": row.generated_at.isoformat() if row.generated_at else None,
+        }
+        for row in rows
+    ]
+
+# --------------------------
+# AI query context
+# --------------------------
+AI_CONTEXT_SQL = {
+    "products": ("Products", """
+        SELECT id, category, brand, title, price, rating
+        FROM products
+        ORDER BY reviews DESC
+        LIMIT :limit
+    """),
+    "amazon_reviews": ("Amazon Reviews", """
+        SELECT product_title, star_rating, review_headline, review_body, review_date
+        FROM "Amazon_Reviews"
+        ORDER BY review_date DESC
+        LIMIT :limit
+    """),
+}
+
+def get_ai_context_rows(db: Session, source: str, limit: int = 50) -> Tuple[str, List[Dict[str, Any]]]:
+    """Rows the /ai/query prompt is built from; raises KeyError for an unknown source"""
+    table_name, sql = AI_CONTEXT_SQL[source]
+    rows = db.execute(text(sql), {"limit": limit}).all()
+    return table_name, [dict(row._mapping) for row in rows]
+
+# --------------------------
+# Sync crawl checkpoints
+# --------------------------
+def get_sync_runs(db: Session, limit: int = 50) -> List[Dict[str, Any]]:
+    """Most recently updated category crawl checkpoints (sync_runs)"""
+    rows = (
+        db.query(models.SyncRun)
+        .order_by(models.SyncRun.updated_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "run_id": row.run_id,
+            "category": row.category,
+            "status": row.status,
+            "attempts": row.attempts,
+            "last_page": row.last_page,
+            "cursor": row.cursor,
+            "items": row.items,
+            "new_items": row.new_items,
+            "started_at": row.started_at.isoformat() if row.started_at else None,
+            "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+        }
+        for row in rows
+    ]
@@ -5,150 +5,250 @@
 # File: server_py/database_sync_service.py (CORRECTED IMPORT)
 
 from server_py.rapidapi import rapidapi_client
-from server_py.database_config import DatabaseService
+from server_py.category_crawler import CategoryCrawler, SYNC_CRAWL_MAX_PAGES
+from server_py.sync_pipeline import FetchJob, SyncPipeline
+import asyncio
 import logging
-from datetime import datetime
-from typing import List
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CATEGORIES = ["electronics", "fashion", "home", "books", "sports"]
+# Search terms for the quick Amazon and Flipkart syncs (comma-separated)
+SYNC_SEARCH_QUERIES = [
+    query.strip()
+    for query in os.getenv("SYNC_SEARCH_QUERIES", "smartphone,laptop,headphones,smartwatch,television").split(",")
+    if query.strip()
+]
+SYNC_SEARCH_PAGES = int(os.getenv("SYNC_SEARCH_PAGES", "2"))
+
 class DataSyncService:
-    """Service to sync data from RapidAPI to database"""
-    
+    """Service to sync data from RapidAPI to database (through SyncPipeline)"""
+
     def __init__(self):
         self.api_client = rapidapi_client
-        self.db_service = DatabaseService()
-    
-    def sync_amazon_products(self, categories: List[str] = None):
-        """Sync Amazon products by categories"""
-        if not categories:
-            categories = ["electronics", "fashion", "home", "books", "sports"]
-        
+
+    # ============================================
+    # NORMALIZERS: API response -> (product rows, deal rows)
+    # ============================================
+
+    def category_rows(self, category: Optional[str], results: List[Dict]) -> List[dict]:
+        """Map one page of category (or search) results to product rows"""
+        return [
+            {
+                'source': 'amazon',
+                'product_id': product.get('asin'),
+                'title': product.get('title'),
+                'brand': product.get('brand'),
+                'category': category or product.get('category'),
+                'price': product.get('price'),
+                'original_price': product.get('original_price'),
+                'discount': product.get('discount'),
+                'rating': product.get('rating'),
+                'reviews_count': product.get('reviews_count'),
+                'image_url': product.get('image'),
+                'product_url': product.get('url'),
+                'availability': product.get('in_stock', True)
+            }
+            for product in results
+        ]
+
+    def amazon_search_rows(self, data: Dict) -> Tuple[List[dict], List[dict]]:
+        return self.category_rows(None, data.get('results', [])), []
+
+    def flipkart_rows(self, data: Dict) -> Tuple[List[dict], List[dict]]:
+        rows = [
+            {
+                'source': 'flipkart',
+                'product_id': product.get('product_id') or product.get('id'),
+                'title': product.get('title') or product.get('name'),
+                'brand': product.get('brand'),
+                'category': product.get('category'),
+                'price': product.get('price'),
+                'original_price': product.get('original_price') or product.get('mrp'),
+                'discount': product.get('discount'),
+                'rating': product.get('rating'),
+                'reviews_count': product.get('reviews_count'),
+                'image_url': product.get('image'),
+                'product_url': product.get('url'),
+                'availability': product.get('in_stock', True)
+            }
+            for product in data.get('results', [])
+        ]
+        return rows, []
+
+    def best_seller_rows(self, data: Dict) -> Tuple[List[dict], List[dict]]:
+        rows = [
+            {
+                'source': 'amazon',
+                'product_id': product.get('asin'),
+                'title': product.get('title'),
+                'price': product.get('price'),
+                'rating': product.get('rating'),
+                'image_url': product.get('image'),
+                'product_url': product.get('url'),
+                'is_bestseller': True
+            }
+            for product in data.get('results', [])
+        ]
+        return rows, []
+
+    def deal_rows(self, data: Dict) -> Tuple[List[dict], List[dict]]:
+        deals = [deal for deal in data.get('deals', []) if deal.get('asin')]
+        product_rows = [
+            {
+                'source': 'amazon',
+                'product_id': deal.get('asin'),
+                'title': deal.get('title'),
+                'price': deal.get('deal_price'),
+                'original_price': deal.get('original_price'),
+                'discount': deal.get('discount_percent'),
+                'image_url': deal.get('image'),
+                'is_deal': True
+            }
+            for deal in deals
+        ]
+        deal_rows = [
+            {
+                'product_id': deal.get('asin'),
+                'source': 'amazon',
+                'deal_type': deal.get('type', 'daily'),
+                'discount_percent': deal.get('discount_percent'),
+                'is_active': True
+            }
+            for deal in deals
+        ]
+        return product_rows, deal_rows
+
+    # ============================================
+    # SOURCES: FetchJobs for the pipeline
+    # ============================================
+
+    def search_jobs(self, source: str, method: str, normalize, queries: List[str], pages: int) -> List[FetchJob]:
+        return [FetchJob(source, method, (query, page), normalize)
+                for query in queries for page in range(1, pages + 1)]
+
+    def amazon_search_jobs(self, queries: List[str] = None, pages: int = SYNC_SEARCH_PAGES) -> List[FetchJob]:
+        return self.search_jobs("amazon_search", "search_amazon_products", self.amazon_search_rows,
+                                queries or SYNC_SEARCH_QUERIES, pages)
+
+    def flipkart_jobs(self, queries: List[str] = None, pages: int = SYNC_SEARCH_PAGES) -> List[FetchJob]:
+        return self.search_jobs("flipkart_search", "search_flipkart_products", self.flipkart_rows,
+                                queries or SYNC_SEARCH_QUERIES, pages)
+
+    def best_seller_jobs(self) -> List[FetchJob]:
+        return [FetchJob("amazon_best_sellers", "get_amazon_best_sellers", (), self.best_seller_rows)]
+
+    def deal_jobs(self) -> List[FetchJob]:
+        return [FetchJob("amazon_deals", "get_amazon_deals", (), self.deal_rows)]
+
+    def run_pipeline(self, jobs: List[FetchJob], categories: List[str] = None,
+                     max_pages: int = SYNC_CRAWL_MAX_PAGES,
+                     on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+                     ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Run jobs through a SyncPipeline, plus a category crawl when categories
+        are given. on_progress receives the pipeline stats while it runs.
+        Returns (pipeline stats, crawl result or None).
+        """
+        pipeline = SyncPipeline(on_progress=on_progress)
+        crawler = None
+        if categories:
+            crawler = CategoryCrawler(self.category_rows)
+            jobs = crawler.seed(pipeline, categories, max_pages) + jobs
+        try:
+            stats = asyncio.run(pipeline.run(jobs))
+        finally:
+            crawl = crawler.finish() if crawler else None
+        return stats, crawl
+
+    def source_count(self, stats: Dict[str, Any], source: str, key: str = None) -> int:
+        """Products saved by one source in a pipeline run (or one counter, e.g. "deals")"""
+        counts = stats.get("sources", {}).get(source, {})
+        if key:
+            return counts.get(key, 0)
+        return counts.get("new", 0) + counts.get("changed", 0) + counts.get("unchanged", 0)
+
+    # ============================================
+    # SYNC ENTRY POINTS
+    # ============================================
+
+    def sync_amazon_products(self, categories: List[str] = None, max_pages: int = SYNC_CRAWL_MAX_PAGES,
+                             on_progress=None) -> Dict[str, Any]:
+        """Crawl Amazon category listings page by page (see CategoryCrawler); resumes interrupted runs"""
         logger.info("="*50)
-        logger.info("Starting Amazon products sync")
-        
-        total_synced = 0
-        
-        for category in categories:
-            try:
-                logger.info(f"Syncing category: {category}")
-                data = self.api_client.get_amazon_category_products(category)
-                products = data.get('results', [])
-                
-                for product in products:
-                    try:
-                        product_data = {
-                            'source': 'amazon',
-                            'product_id': product.get('asin'),
-                            'title': product.get('title'),
-                            'brand': product.get('brand'),
-                            'category': category,
-                            'price': product.get('price'),
-                            'original_price': product.get('original_price'),
-                            'discount': product.get('discount'),
-                            'rating': product.get('rating'),
-                            'reviews_count': product.get('reviews_count'),
-                            'image_url': product.get('image'),
-                            'product_url': product.get('url'),
-                            'availability': product.get('in_stock', True)
-                        }
-                        
-                        self.db_service.save_product(product_data)
-                        total_synced += 1
-                    except Exception as e:
-                        logger.error(f"Error saving product: {str(e)}")
-                        continue
-                
-            except Exception as e:
-                logger.error(f"Error syncing category {category}: {str(e)}")
-                continue
-        
-        logger.info(f"✅ Synced {total_synced} Amazon products")
+        logger.info("Starting Amazon products crawl")
+        _, crawl = self.run_pipeline([], categories or DEFAULT_CATEGORIES, max_pages, on_progress)
+        logger.info(f"✅ Synced {crawl['products']} Amazon products over {crawl['pages']} pages "
+                    f"(run {crawl['run_id']}, complete={crawl['complete']})")
         logger.info("="*50)
-        return total_synced
-    
-    def sync_amazon_best_sellers(self):
+        return crawl
+
+    def sync_amazon_products_by_search(self, queries: List[str] = None, pages: int = SYNC_SEARCH_PAGES,
+                                       on_progress=None) -> int:
+        """Sync Amazon products for the configured search terms"""
+        logger.info("Syncing Amazon search results")
+        stats, _ = self.run_pipeline(self.amazon_search_jobs(queries, pages), on_progress=on_progress)
+        count = self.source_count(stats, "amazon_search")
+        logger.info(f"✅ Synced {count} Amazon search products")
+        return count
+
+    def sync_flipkart_products(self, queries: List[str] = None, pages: int = SYNC_SEARCH_PAGES,
+                               on_progress=None) -> int:
+        """Sync Flipkart products for the configured search terms"""
+        logger.info("Syncing Flipkart search results")
+        stats, _ = self.run_pipeline(self.flipkart_jobs(queries, pages), on_progress=on_progress)
+        count = self.source_count(stats, "flipkart_search")
+        logger.info(f"✅ Synced {count} Flipkart products")
+        return count
+
+    def sync_amazon_best_sellers(self) -> int:
         """Sync Amazon best sellers"""
         logger.info("Syncing Amazon best sellers")
-        try:
-            data = self.api_client.get_amazon_best_sellers()
-            products = data.get('results', [])
-            
-            count = 0
-            for product in products:
-                try:
-                    product_data = {
-                        'source': 'amazon',
-                        'product_id': product.get('asin'),
-                        'title': product.get('title'),
-                        'price': product.get('price'),
-                        'rating': product.get('rating'),
-                        'image_url': product.get('image'),
-                        'product_url': product.get('url'),
-                        'is_bestseller': True
-                    }
-                    
-                    self.db_service.save_product(product_data)
-                    count += 1
-                except Exception as e:
-                    logger.error(f"Error: {str(e)}")
-                    continue
-            
-            logger.info(f"✅ Synced {count} best sellers")
-        except Exception as e:
-            logger.error(f"Error syncing best sellers: {str(e)}")
-    
-    def sync_amazon_deals(self):
+        stats, _ = self.run_pipeline(self.best_seller_jobs())
+        count = self.source_count(stats, "amazon_best_sellers")
+        logger.info(f"✅ Synced {count} best sellers")
+        return count
+
+    def sync_amazon_deals(self) -> int:
         """Sync Amazon deals"""
         logger.info("Syncing Amazon deals")
-        try:
-            data = self.api_client.get_amazon_deals()
-            deals = data.get('deals', [])
-            
-            count = 0
-            for deal in deals:
-                try:
-                    product_data = {
-                        'source': 'amazon',
-                        'product_id': deal.get('asin'),
-                        'title': deal.get('title'),
-                        'price': deal.get('deal_price'),
-                        'original_price': deal.get('original_price'),
-                        'discount': deal.get('discount_percent'),
-                        'image_url': deal.get('image'),
-                        'is_deal': True
-                    }
-                    
-                    self.db_service.save_product(product_data)
-                    
-                    deal_data = {
-                        'product_id': deal.get('asin'),
-                        'source': 'amazon',
-                        'deal_type': deal.get('type', 'daily'),
-                        'discount_percent': deal.get('discount_percent'),
-                        'is_active': True
-                    }
-                    
-                    self.db_service.save_deal(deal_data)
-                    count += 1
-                except Exception as e:
-                    logger.error(f"Error: {str(e)}")
-                    continue
-            
-            logger.info(f"✅ Synced {count} deals")
-        except Exception as e:
-            logger.error(f"Error syncing deals: {str(e)}")
-    
-    def full_sync(self):
-        """Perform full sync of all data"""
+        stats, _ = self.run_pipeline(self.deal_jobs())
+        count = self.source_count(stats, "amazon_deals", "deals")
+        logger.info(f"✅ Synced {count} deals")
+        return count
+
+    def full_sync(self, categories: List[str] = None, max_pages: int = SYNC_CRAWL_MAX_PAGES,
+                  on_progress=None) -> Dict[str, Any]:
+        """Perform full sync: category crawl, best sellers, deals and Flipkart search in one pipeline"""
         logger.info("🚀 Starting full data sync")
-        self.sync_amazon_products()
-        self.sync_amazon_best_sellers()
-        self.sync_amazon_deals()
-        logger.info("✅ Full sync completed")
-    
-    def __del__(self):
-        self.db_service.close()
+        started = time.perf_counter()
+
+        jobs = self.best_seller_jobs() + self.deal_jobs() + self.flipkart_jobs()
+        stats, crawl = self.run_pipeline(jobs, categories or DEFAULT_CATEGORIES, max_pages, on_progress)
+
+        products = crawl["products"]
+        bestsellers = self.source_count(stats, "amazon_best_sellers")
+        deal_count = self.source_count(stats, "amazon_deals", "deals")
+        flipkart = self.source_count(stats, "flipkart_search")
+        result = {
+            "products": products,
+            "best_sellers": bestsellers,
+            "deals": deal_count,
+            "flipkart": flipkart,
+            "total": products + bestsellers + deal_count + flipkart,
+            "new": stats["counts"].get("new", 0),
+            "changed": stats["counts"].get("changed", 0),
+            "unchanged": stats["counts"].get("unchanged", 0),
+            "duration": time.perf_counter() - started,
+            "crawl_run_id": crawl["run_id"],
+            "crawl_complete": crawl["complete"],
+            "stages": stats["stages"],
+        }
+        logger.info(f"✅ Full sync completed: {result}")
+        return result
 
 # Create global instance
 data_sync_service = DataSyncService()
@@ -0,0 +1,63 @@
+# ============================================
+# ETag / conditional GET for analytics endpoints
+# ============================================
+# File: server_py/etag.py
+#
+# The ETag of a listed route is built from the data_versions counters of the
+# tables it reads (the same counters the result cache keys on), so a matching
+# If-None-Match is answered with 304 before the endpoint or any SQL runs.
+
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from server_py.cache import result_cache
+from server_py.database_config import SessionLocal
+
+# Route path -> tables whose data the response is derived from
+ETAG_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "/analytics/summary": ("products",),
+    "/analytics/category": ("products",),
+    "/products": ("products",),
+    "/Amazon_Reviews/statistics": ("Amazon_Reviews",),
+    "/Amazon_Reviews/sentiment": ("Amazon_Reviews",),
+    "/Amazon_Reviews/ratings": ("Amazon_Reviews",),
+    "/Amazon_Reviews/categories": ("Amazon_Reviews",),
+    "/Amazon_Reviews/trending": ("Amazon_Reviews",),
+    "/Amazon_Reviews/trends/monthly": ("Amazon_Reviews",),
+    "/top": ("products", "Amazon_Reviews"),
+    "/top_forecast": ("product_forecasts",),
+}
+
+
+def current_etag(tables: Tuple[str, ...]) -> str:
+    """Weak ETag from the memoized table versions (usually no query at all)"""
+    with SessionLocal() as db:
+        versions = result_cache.versions.get(db, tables)
+    return 'W/"' + "-".join(f"{table}.{versions[table]}" for table in tables) + '"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: ignore the W/ prefix on either side
+    bare = etag.removeprefix("W/")
+    return "*" in candidates or any(tag.removeprefix("W/") == bare for tag in candidates)
+
+
+async def etag_middleware(request: Request, call_next):
+    tables = ETAG_ROUTES.get(request.url.path)
+    if request.method != "GET" or tables is None:
+        return await call_next(request)
+
+    etag = await run_in_threadpool(current_etag, tables)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,76 @@
+# ============================================
+# Forecasting backend registry
+# ============================================
+# File: server_py/forecast_backends.py
+#
+# Backends are registered by import path ("module:attribute") and imported on
+# first use, so the API process never pays for TensorFlow unless a backend
+# that needs it is asked for. Each backend is a callable
+#     backend(df, matrix) -> one forecast per product, sorted by id
+# where df has id/title/price/date rows and matrix is
+# forecasting.to_series_matrix(df)[2].
+#
+# Extra backends can be plugged in without code changes:
+#     FORECAST_BACKENDS="prophet=mypkg.prophet_backend:forecast,..."
+
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Union
+
+logger = logging.getLogger(__name__)
+
+ForecastBackend = Callable[..., Any]
+
+_registry: Dict[str, Union[str, ForecastBackend]] = {
+    "smoothing": "server_py.forecasting:smoothing_backend",
+    # Heavy imports happen in the forecast worker processes, not here
+    "lstm": "server_py.forecasting:lstm_forecast",
+}
+_loaded: Dict[str, ForecastBackend] = {}
+_load_seconds: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def register_backend(name: str, target: Union[str, ForecastBackend]) -> None:
+    """Register a backend callable, or a "module:attribute" path to import lazily"""
+    with _lock:
+        _registry[name] = target
+        _loaded.pop(name, None)
+
+
+def _resolve(target: Union[str, ForecastBackend]) -> ForecastBackend:
+    if callable(target):
+        return target
+    module_name, _, attribute = target.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def get_backend(name: str) -> ForecastBackend:
+    """Return the named backend, importing it on first use"""
+    backend = _loaded.get(name)
+    if backend is not None:
+        return backend
+    with _lock:
+        if name not in _loaded:
+            if name not in _registry:
+                raise ValueError(f"Unknown forecast model: {name}")
+            started = time.perf_counter()
+            _loaded[name] = _resolve(_registry[name])
+            _load_seconds[name] = time.perf_counter() - started
+            logger.info(f"Loaded forecast backend '{name}' in {_load_seconds[name]:.2f}s")
+        return _loaded[name]
+
+
+def backend_status() -> Dict[str, Any]:
+    return {
+        name: {"loaded": name in _loaded, "load_seconds": _load_seconds.get(name)}
+        for name in _registry
+    }
+
+
+for _entry in filter(None, os.getenv("FORECAST_BACKENDS", "").split(",")):
+    _name, _, _target = _entry.partition("=")
+    register_backend(_name.strip(), _target.strip())
@@ -0,0 +1,155 @@
+# ============================================
+# Process-pool LSTM forecast training
+# ============================================
+# File: server_py/forecast_worker.py
+#
+# Spreads per-product LSTM training across a process pool (one TensorFlow
+# thread per process). Every fitted model, its scaler and its forecast are
+# saved under FORECAST_MODEL_DIR/<product>/<watermark>.*, where the watermark
+# is a hash of the product's price series:
+#   - same watermark on disk  -> skipped, the stored forecast is reused
+#   - older watermark on disk -> warm-started from those weights
+#   - nothing on disk         -> trained from scratch
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORECAST_MODEL_DIR = os.getenv("FORECAST_MODEL_DIR", "forecast_models")
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(os.cpu_count() or 1)))
+FORECAST_EPOCHS = int(os.getenv("FORECAST_EPOCHS", "50"))
+FORECAST_WARM_EPOCHS = int(os.getenv("FORECAST_WARM_EPOCHS", "10"))
+FORECAST_LOOK_BACK = int(os.getenv("FORECAST_LOOK_BACK", "5"))
+
+
+def series_watermark(prices: np.ndarray, look_back: int) -> str:
+    digest = hashlib.sha1(np.asarray(prices, dtype=np.float64).tobytes())
+    digest.update(str(look_back).encode())
+    return digest.hexdigest()[:16]
+
+
+def _product_dir(model_dir: str, product_id: int) -> Path:
+    return Path(model_dir) / str(product_id)
+
+
+def _stored_forecast(model_dir: str, product_id: int, watermark: str) -> Optional[float]:
+    path = _product_dir(model_dir, product_id) / f"{watermark}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())["forecast_price"]
+
+
+def _init_worker() -> None:
+    # One op thread per process: the pool provides the parallelism
+    os.environ.setdefault("TF_NUM_INTRAOP_THREADS", "1")
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+
+def train_product(task: Tuple[int, np.ndarray, str, str, int, int, int]) -> Dict[str, Any]:
+    """Worker entry point: fit (or warm-start) one product's LSTM and persist it"""
+    product_id, prices, watermark, model_dir, look_back, epochs, warm_epochs = task
+    started = time.perf_counter()
+    directory = _product_dir(model_dir, product_id)
+    try:
+        from tensorflow.keras.models import load_model
+        from server_py.lstm_model import fit_price_lstm
+
+        previous = sorted(directory.glob("*.keras"), key=lambda p: p.stat().st_mtime) if directory.exists() else []
+        model, status = None, "trained"
+        if previous:
+            model, status = load_model(previous[-1]), "warm_started"
+
+        forecast, model, scaler = fit_price_lstm(
+            prices, look_back=look_back, epochs=warm_epochs if status == "warm_started" else epochs, model=model
+        )
+        if model is None:
+            status = "fallback"
+
+        directory.mkdir(parents=True, exist_ok=True)
+        if model is not None:
+            model.save(directory / f"{watermark}.keras")
+            with open(directory / f"{watermark}.scaler.pkl", "wb") as f:
+                pickle.dump(scaler, f)
+        (directory / f"{watermark}.json").write_text(json.dumps({
+            "forecast_price": forecast,
+            "points": len(prices),
+            "status": status,
+            "trained_at": datetime.utcnow().isoformat(),
+        }))
+        # Keep only the newest watermark per product
+        for path in directory.iterdir():
+            if not path.name.startswith(watermark):
+                path.unlink()
+    except Exception as e:
+        logger.error(f"Forecast training failed for product {product_id}: {e}")
+        forecast, status = float(prices[-1]), "failed"
+
+    return {"product_id": product_id, "forecast_price": forecast, "status": status,
+            "seconds": time.perf_counter() - started}
+
+
+def train_all(df: pd.DataFrame, model_dir: str = FORECAST_MODEL_DIR, workers: int = FORECAST_WORKERS,
+              look_back: int = FORECAST_LOOK_BACK, epochs: int = FORECAST_EPOCHS,
+              warm_epochs: int = FORECAST_WARM_EPOCHS) -> Tuple[List[float], Dict[str, Any]]:
+    """
+    Forecast every product in df (id, price, date), sorted by id.
+    Returns the forecasts and the run's throughput metrics.
+    """
+    started = time.perf_counter()
+    forecasts: Dict[int, float] = {}
+    counts = {"trained": 0, "warm_started": 0, "skipped": 0, "fallback": 0, "failed": 0}
+
+    tasks = []
+    for product_id, group in df.sort_values("date").groupby("id", sort=True):
+        prices = group["price"].to_numpy(dtype=float)
+        watermark = series_watermark(prices, look_back)
+        stored = _stored_forecast(model_dir, int(product_id), watermark)
+        if stored is not None:
+            forecasts[int(product_id)] = stored
+            counts["skipped"] += 1
+        else:
+            tasks.append((int(product_id), prices, watermark, model_dir, look_back, epochs, warm_epochs))
+
+    if tasks:
+        workers = max(1, min(workers, len(tasks)))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker) as pool:
+            chunksize = max(1, len(tasks) // (workers * 8))
+            for result in pool.map(train_product, tasks, chunksize=chunksize):
+                forecasts[result["product_id"]] = result["forecast_price"]
+                counts[result["status"]] += 1
+
+    duration = time.perf_counter() - started
+    metrics = {
+        "products": len(forecasts),
+        **counts,
+        "workers": workers if tasks else 0,
+        "duration": round(duration, 3),
+        "products_per_sec": round(len(forecasts) / duration, 2) if duration else None,
+        "trained_per_sec": round(len(tasks) / duration, 2) if tasks and duration else None,
+        "finished_at": datetime.utcnow().isoformat(),
+    }
+    Path(model_dir).mkdir(parents=True, exist_ok=True)
+    (Path(model_dir) / "last_run.json").write_text(json.dumps(metrics))
+    logger.info(f"Forecast training run: {metrics}")
+
+    return [forecasts[pid] for pid in sorted(forecasts)], metrics
+
+
+def last_run_metrics(model_dir: str = FORECAST_MODEL_DIR) -> Optional[Dict[str, Any]]:
+    path = Path(model_dir) / "last_run.json"
+    return json.loads(path.read_text()) if path.exists() else None
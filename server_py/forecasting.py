@@ -0,0 +1,162 @@
+# ============================================
+# Offline price forecasting pipeline
+# ============================================
+# File: server_py/forecasting.py
+#
+# Trains on a schedule (see schedule.py) and stores one row per product in
+# product_forecasts, so /top_forecast is an indexed ORDER BY ... LIMIT.
+#
+# Models:
+#   lstm       - the per-product Keras LSTM, trained across a process pool
+#                with persisted models (see forecast_worker.py)
+#   smoothing  - Holt's linear exponential smoothing, vectorized over every
+#                series at once in NumPy; cheap enough for large catalogs
+#   auto       - lstm up to FORECAST_LSTM_MAX_PRODUCTS series, else smoothing
+#
+# Models are looked up in forecast_backends, which imports them on first use.
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import bump_version
+from .database_config import SessionLocal, engine
+from .forecast_backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+FORECAST_MODEL = os.getenv("FORECAST_MODEL", "auto")
+FORECAST_LSTM_MAX_PRODUCTS = int(os.getenv("FORECAST_LSTM_MAX_PRODUCTS", "200"))
+SMOOTHING_ALPHA = float(os.getenv("FORECAST_SMOOTHING_ALPHA", "0.5"))
+SMOOTHING_BETA = float(os.getenv("FORECAST_SMOOTHING_BETA", "0.3"))
+CURRENCY = "₹"
+
+# Daily closing prices from the price history rollups (small rows, one per product-day)
+HISTORY_SQL = """
+SELECT p.id, p.title, r.last_price AS price, r.bucket_start AS date
+FROM product_price_rollups r
+JOIN products p ON p.product_id = r.product_id
+WHERE r.bucket = 'day'
+ORDER BY p.id, r.bucket_start
+"""
+
+# Before any history exists: the current price of every product
+FALLBACK_HISTORY_SQL = "SELECT id, title, price, last_updated AS date FROM products WHERE price IS NOT NULL ORDER BY id, last_updated"
+
+
+def load_price_histories(db: Session) -> pd.DataFrame:
+    """One row per (product, day): id, title, price, date"""
+    df = pd.read_sql(HISTORY_SQL, db.bind)
+    if df.empty:
+        df = pd.read_sql(FALLBACK_HISTORY_SQL, db.bind)
+    return df
+
+
+def to_series_matrix(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Left-align every product's price series in a 2D array (products x time),
+    padded with NaN on the right. Returns (ids, lengths, matrix).
+    """
+    df = df.sort_values(["id", "date"], kind="stable")
+    ids, lengths = np.unique(df["id"].to_numpy(), return_counts=True)
+    row = np.repeat(np.arange(len(ids)), lengths)
+    col = df.groupby("id", sort=True).cumcount().to_numpy()
+    matrix = np.full((len(ids), int(lengths.max()) if len(ids) else 0), np.nan)
+    matrix[row, col] = df["price"].to_numpy(dtype=float)
+    return ids, lengths, matrix
+
+
+def smoothing_forecast(matrix: np.ndarray, alpha: float = SMOOTHING_ALPHA,
+                       beta: float = SMOOTHING_BETA) -> np.ndarray:
+    """
+    Holt's linear exponential smoothing for all series at once: one vectorized
+    update per time step, so cost is O(products x max_length) in NumPy.
+    Returns the one-step-ahead forecast per row.
+    """
+    if matrix.size == 0:
+        return np.empty(len(matrix))
+    level = matrix[:, 0].copy()
+    trend = np.zeros(len(matrix))
+    for t in range(1, matrix.shape[1]):
+        x = matrix[:, t]
+        valid = ~np.isnan(x)
+        previous = level
+        level = np.where(valid, alpha * x + (1 - alpha) * (level + trend), level)
+        trend = np.where(valid, beta * (level - previous) + (1 - beta) * trend, trend)
+    return level + trend
+
+
+def smoothing_backend(df: pd.DataFrame, matrix: np.ndarray) -> np.ndarray:
+    return smoothing_forecast(matrix)
+
+
+def lstm_forecast(df: pd.DataFrame, matrix: Optional[np.ndarray] = None) -> List[float]:
+    """Per-product LSTM; unchanged series reuse their persisted forecast"""
+    from .forecast_worker import train_all
+
+    forecasts, _ = train_all(df)
+    return forecasts
+
+
+def compute_forecasts(df: pd.DataFrame, model: str = FORECAST_MODEL) -> List[Dict[str, Any]]:
+    ids, lengths, matrix = to_series_matrix(df)
+    if model == "auto":
+        model = "lstm" if len(ids) <= FORECAST_LSTM_MAX_PRODUCTS else "smoothing"
+
+    forecasts = get_backend(model)(df, matrix)
+
+    titles = df.groupby("id", sort=True)["title"].first()
+    generated_at = datetime.utcnow()
+    return [
+        {
+            "product_id": int(pid),
+            "title": titles.loc[pid],
+            "forecast_price": float(price),
+            "currency": CURRENCY,
+            "model": model,
+            "history_points": int(length),
+            "generated_at": generated_at,
+        }
+        for pid, length, price in zip(ids, lengths, forecasts)
+        if not np.isnan(price)
+    ]
+
+
+def refresh_forecasts(db: Session, model: str = FORECAST_MODEL) -> Dict[str, Any]:
+    """Recompute every product's forecast and replace product_forecasts in one transaction"""
+    started = time.perf_counter()
+    rows = compute_forecasts(load_price_histories(db), model)
+
+    try:
+        db.query(models.ProductForecast).delete()
+        db.bulk_insert_mappings(models.ProductForecast, rows)
+        bump_version(db, "product_forecasts")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    duration = time.perf_counter() - started
+    used = rows[0]["model"] if rows else model
+    logger.info(f"Forecasts refreshed: {len(rows)} products with {used} in {duration:.2f}s")
+    return {"products": len(rows), "model": used, "duration": duration}
+
+
+if __name__ == "__main__":
+    # Refresh: python -m server_py.forecasting [lstm|smoothing|auto]
+    import sys
+
+    models.Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        print(refresh_forecasts(db, sys.argv[1] if len(sys.argv) > 1 else FORECAST_MODEL))
+    finally:
+        db.close()
@@ -0,0 +1,179 @@
+# ============================================
+# On-disk RapidAPI response cache and record/replay
+# ============================================
+# File: server_py/http_cache.py
+#
+# Successful RapidAPI JSON responses are stored zlib-compressed in a SQLite
+# file (RAPIDAPI_CACHE_PATH), keyed by host, path and params (never the API
+# key). Both RapidAPIClient and AsyncRapidAPIClient go through it.
+#
+# RAPIDAPI_HTTP_MODE:
+#   off     - no cache; every call hits RapidAPI (default, and what production syncs use)
+#   cache   - serve entries younger than the endpoint's TTL, else fetch and store
+#   record  - always fetch, store every response (builds a fixture file)
+#   replay  - serve stored responses regardless of age, never touch the network
+#
+# cache, record and replay are opt-in for development and tests. The SQLite
+# file is only created when one of them first reads or writes it.
+#
+# TTL per endpoint path: RAPIDAPI_CACHE_TTL_<PATH>, e.g. RAPIDAPI_CACHE_TTL_DEALS=600.
+# Fetch time is stored rather than an expiry, so TTL changes apply to old entries.
+#
+#     RAPIDAPI_HTTP_MODE=cache make run
+#     RAPIDAPI_HTTP_MODE=record python -m server_py.database_sync_service ...
+#     RAPIDAPI_HTTP_MODE=replay RAPIDAPI_CACHE_PATH=fixtures.sqlite make ...
+#     python -m server_py.http_cache stats|purge|clear
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RAPIDAPI_HTTP_MODE = os.getenv("RAPIDAPI_HTTP_MODE", "off").lower()
+RAPIDAPI_CACHE_PATH = os.getenv("RAPIDAPI_CACHE_PATH", "rapidapi_cache.sqlite")
+
+# Seconds a response stays fresh, by endpoint path
+DEFAULT_TTLS = {
+    "/search": 3600,
+    "/category": 3600,
+    "/bestsellers": 3600,
+    "/deals": 900,
+    "/product": 6 * 3600,
+    "/reviews": 6 * 3600,
+}
+DEFAULT_TTL = 3600
+
+MODES = ("cache", "record", "replay", "off")
+
+
+def endpoint_ttl(path: str) -> float:
+    env = os.getenv("RAPIDAPI_CACHE_TTL_" + path.strip("/").upper().replace("/", "_"))
+    return float(env) if env else DEFAULT_TTLS.get(path, DEFAULT_TTL)
+
+
+def request_key(host: str, path: str, params: Optional[Dict[str, Any]]) -> str:
+    canonical = json.dumps([host, path, sorted((params or {}).items())], default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class ReplayMiss(Exception):
+    """Replay mode has no recorded response for a request"""
+
+
+class ResponseCache:
+    """SQLite store of compressed JSON responses; safe to share between threads"""
+
+    def __init__(self, path: str = RAPIDAPI_CACHE_PATH, mode: str = RAPIDAPI_HTTP_MODE):
+        if mode not in MODES:
+            raise ValueError(f"RAPIDAPI_HTTP_MODE must be one of {MODES}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self._local = threading.local()
+        self.hits = self.misses = self.stores = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection; opening it creates the file and table on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, host TEXT NOT NULL, path TEXT NOT NULL, params TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL, body BLOB NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _exists(self) -> bool:
+        return getattr(self._local, "conn", None) is not None or os.path.exists(self.path)
+
+    def lookup(self, host: str, path: str, params: Optional[Dict[str, Any]]) -> Optional[Any]:
+        """
+        Stored response to serve instead of a network call, or None to fetch.
+        Raises ReplayMiss in replay mode when nothing was recorded.
+        """
+        if self.mode in ("off", "record"):
+            return None
+        row = self._connect().execute(
+            "SELECT fetched_at, body FROM responses WHERE key = ?", (request_key(host, path, params),)
+        ).fetchone()
+        fresh = row is not None and (self.mode == "replay" or time.time() - row[0] < endpoint_ttl(path))
+        if not fresh:
+            self.misses += 1
+            if self.mode == "replay":
+                raise ReplayMiss(f"No recorded response for {host}{path} {params}")
+            return None
+        self.hits += 1
+        return json.loads(zlib.decompress(row[1]))
+
+    def store(self, host: str, path: str, params: Optional[Dict[str, Any]], data: Any) -> None:
+        if self.mode not in ("cache", "record"):
+            return
+        # Error payloads (and anything that is not a JSON object) would be replayed as answers
+        if not isinstance(data, dict) or "error" in data:
+            return
+        try:
+            body = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+            self._connect().execute(
+                "INSERT OR REPLACE INTO responses (key, host, path, params, fetched_at, body) VALUES (?, ?, ?, ?, ?, ?)",
+                (request_key(host, path, params), host, path, json.dumps(params or {}, default=str, sort_keys=True),
+                 time.time(), body),
+            )
+            self.stores += 1
+        except Exception as e:
+            logger.warning(f"RapidAPI response cache write failed: {e}")
+
+    def purge_expired(self) -> int:
+        """Delete entries older than their endpoint's TTL (recorded fixtures are kept in replay mode)"""
+        if not self._exists():
+            return 0
+        conn = self._connect()
+        now = time.time()
+        stale = [key for key, path, fetched_at in conn.execute("SELECT key, path, fetched_at FROM responses")
+                 if now - fetched_at >= endpoint_ttl(path)]
+        conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in stale])
+        return len(stale)
+
+    def clear(self) -> None:
+        if self._exists():
+            self._connect().execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"mode": self.mode, "path": self.path,
+                                  "hits": self.hits, "misses": self.misses, "stores": self.stores}
+        # Entries are listed whenever the file exists, so the CLI works in any mode
+        if self._exists():
+            result["entries"] = {
+                path: {"count": count, "bytes": size}
+                for path, count, size in self._connect().execute(
+                    "SELECT path, COUNT(*), SUM(LENGTH(body)) FROM responses GROUP BY path"
+                )
+            }
+        return result
+
+
+# Create global instance
+response_cache = ResponseCache()
+
+
+if __name__ == "__main__":
+    # python -m server_py.http_cache [stats|purge|clear]
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "purge":
+        print(f"Purged {response_cache.purge_expired()} expired responses.")
+    elif command == "clear":
+        response_cache.clear()
+        print("Cleared the response cache.")
+    else:
+        print(json.dumps(response_cache.stats(), indent=2))
@@ -0,0 +1,91 @@
+# ============================================
+# Local LLM client (Ollama-compatible HTTP API)
+# ============================================
+# File: server_py/llm_client.py
+#
+# One pooled, keep-alive httpx.AsyncClient per process talking to
+# POST {OLLAMA_BASE_URL}/api/generate, which streams newline-delimited JSON:
+#     {"response": "<token>", "done": false}
+#     ...
+#     {"response": "", "done": true, ...}
+# Closing the stream closes the upstream connection, which is how Ollama
+# learns to stop generating; /ai/query relies on that when a client leaves.
+#
+# Point OLLAMA_BASE_URL at `python -m server_py.ollama_stub` to run without a
+# model.
+
+import json
+import logging
+import os
+from typing import AsyncIterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+# Longest gap allowed between two streamed chunks (model load can be slow)
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+
+
+class LLMError(Exception):
+    """The LLM server could not be reached or returned an error"""
+
+
+class OllamaClient:
+    """Streaming client for a local Ollama-compatible server"""
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, model: str = OLLAMA_MODEL,
+                 max_connections: int = OLLAMA_MAX_CONNECTIONS):
+        self.base_url = base_url
+        self.model = model
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def stream(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the answer token by token; closing the iterator cancels generation"""
+        payload = {"model": model or self.model, "prompt": prompt, "stream": True}
+        try:
+            async with self.client.stream("POST", "/api/generate", json=payload) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", "ignore")
+                    raise LLMError(f"LLM server returned {response.status_code}: {body[:200]}")
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise LLMError(chunk["error"])
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        return
+        except httpx.HTTPError as e:
+            raise LLMError(f"LLM server unavailable: {e}") from e
+
+    async def generate(self, prompt: str, model: Optional[str] = None) -> str:
+        """Whole answer as one string"""
+        return "".join([token async for token in self.stream(prompt, model)]).strip()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+llm_client = OllamaClient()
@@ -1,7 +1,8 @@
 import pandas as pd
 from sqlalchemy.orm import Session
 from .database_config import SessionLocal, engine
-from . import models
+from . import models, rollups
+from .cache import bump_version
 
 # Path to the CSV file
 CSV_PATH = "amazon_pc_Data_enriched.csv"
@@ -30,8 +31,10 @@ def load_data_from_csv(db: Session, csv_path: str = CSV_PATH):
         # Convert DataFrame to a list of dictionaries
         data_to_load = df.to_dict(orient="records")
 
-        # Bulk insert the data
+        # Bulk insert the data and fold it into the rollups in the same transaction
         db.bulk_insert_mappings(models.AmazonReview, data_to_load)
+        rollups.apply_rollup_deltas(db, data_to_load)
+        bump_version(db, "Amazon_Reviews")
         db.commit()
 
         print(f"Successfully loaded {len(data_to_load)} records into the database.")
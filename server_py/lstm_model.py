@@ -0,0 +1,48 @@
+# ============================================
+# Keras LSTM price model
+# ============================================
+# File: server_py/lstm_model.py
+#
+# Imports TensorFlow and scikit-learn at module level, so import this module
+# only where a model is actually trained: the "lstm" forecast backend, the
+# forecast worker processes, or crud.forecast_next_price on first call.
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+from tensorflow.keras.layers import LSTM, Dense
+from tensorflow.keras.models import Sequential
+
+
+def fit_price_lstm(price_values: np.ndarray, look_back=5, epochs=50, model=None):
+    """
+    Fit the two-layer LSTM on one price series and predict the next price.
+    Pass a previously fitted model to warm-start from its weights.
+    Returns (next_price, model, scaler); model and scaler are None when the
+    series is too short and the last price is returned as the forecast.
+    """
+    if len(price_values) <= look_back:
+        return float(price_values[-1]), None, None  # fallback if not enough data
+ 
+    scaler = MinMaxScaler()
+    prices = scaler.fit_transform(np.asarray(price_values, dtype=float).reshape(-1,1))
+ 
+    X, y = [], []
+    for i in range(look_back, len(prices)):
+        X.append(prices[i-look_back:i,0])
+        y.append(prices[i,0])
+ 
+    X, y = np.array(X), np.array(y)
+    X = X.reshape(X.shape[0], X.shape[1], 1)
+ 
+    if model is None:
+        model = Sequential()
+        model.add(LSTM(50, return_sequences=True, input_shape=(X.shape[1],1)))
+        model.add(LSTM(50))
+        model.add(Dense(1))
+        model.compile(optimizer='adam', loss='mean_squared_error')
+    model.fit(X, y, epochs=epochs, batch_size=16, verbose=0)
+ 
+    last_sequence = X[-1]
+    next_price = model.predict(last_sequence.reshape(1, look_back,1), verbose=0)
+    next_price = scaler.inverse_transform(next_price.reshape(-1,1))[0,0]
+    return float(next_price), model, scaler
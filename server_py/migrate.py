@@ -0,0 +1,85 @@
+# ============================================
+# One-off schema migration
+# ============================================
+# File: server_py/migrate.py
+#
+# Brings an existing database up to the current models. Run it once after
+# upgrading, before (re)starting the API and the scheduler worker:
+#
+#     python -m server_py.migrate        (make migrate)
+#
+# Nothing here runs at import or startup. Several API workers would race on the
+# same DDL, and some of it is heavy:
+#   - Adding the generated search_vector column rewrites the whole
+#     Amazon_Reviews table under an ACCESS EXCLUSIVE lock, so run it in a
+#     maintenance window.
+#   - Indexes are built with CREATE INDEX CONCURRENTLY, so reads and writes
+#     continue. A build that failed midway leaves an INVALID index; it is
+#     dropped and rebuilt on the next run.
+#   - review_rollups is built with one full GROUP BY over Amazon_Reviews when
+#     it is still empty (later rebuilds: python -m server_py.rollups).
+# Every step is idempotent.
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from server_py import models, rollups
+from server_py.database_config import engine
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Columns added to tables that existed before the column did
+ADD_COLUMNS = [
+    # Review search (weighted tsvector)
+    'ALTER TABLE "Amazon_Reviews" ADD COLUMN IF NOT EXISTS search_vector tsvector '
+    f"GENERATED ALWAYS AS ({models.SEARCH_VECTOR_SQL}) STORED",
+    # Product content fingerprint for delta sync
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS content_hash VARCHAR(40)",
+    # Crawl checkpoint retry counter
+    "ALTER TABLE sync_runs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0",
+]
+
+
+def add_columns(bind) -> None:
+    for statement in ADD_COLUMNS:
+        logger.info(f"Applying: {statement[:80]}...")
+        with bind.begin() as conn:
+            conn.execute(text(statement))
+
+
+def create_indexes(bind) -> None:
+    """Create every declared index that is missing (or INVALID) without blocking writes"""
+    # CONCURRENTLY cannot run inside a transaction block
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                valid = conn.execute(
+                    text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                         "WHERE c.relname = :name"),
+                    {"name": index.name},
+                ).scalar()
+                if valid:
+                    continue
+                if valid is False:
+                    logger.warning(f"Dropping invalid index {index.name} left by a failed build")
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                index.dialect_options["postgresql"]["concurrently"] = True
+                logger.info(f"Creating index {index.name} on {table.name}")
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def migrate(bind=engine) -> None:
+    models.Base.metadata.create_all(bind=bind)
+    add_columns(bind)
+    create_indexes(bind)
+    with Session(bind=bind) as db:
+        rollups.ensure_rollups(db)
+
+
+if __name__ == "__main__":
+    migrate()
+    print("Schema is up to date.")
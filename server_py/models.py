@@ -55,14 +55,26 @@
 # ============================================
 # File: server_py/models.py (CORRECTED)
 
-from sqlalchemy import Column, String, Text, Integer, Float, Boolean, JSON, TIMESTAMP, DateTime, ARRAY
+from sqlalchemy import Column, String, Text, Integer, BigInteger, Float, Boolean, JSON, TIMESTAMP, DateTime, Date, ARRAY, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from sqlalchemy import DateTime
+import hashlib
+import json
 
 # Import Base from database_config
 from server_py.database_config import Base
 
+# Text search configuration and field weights: title (A) > headline (B) > body (C)
+SEARCH_CONFIG = "english"
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(product_title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(review_headline, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(review_body, '')), 'C')"
+)
+
 class AmazonReview(Base):
     __tablename__ = "Amazon_Reviews"   
 
@@ -90,6 +102,31 @@ class AmazonReview(Base):
     rating_3 = Column("3 ratings", Integer)
     rating_4 = Column("4 rating", Integer)
     rating_5 = Column("5 rating", Integer)
+    # Generated by Postgres on every insert/update, so ingest keeps it current
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
+
+    __table_args__ = (
+        # Keyset pagination of a product's reviews in review_id order
+        Index("ix_amazon_reviews_product_review", "product_id", "review_id"),
+        Index("ix_amazon_reviews_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+class ReviewRollup(Base):
+    """
+    Pre-aggregated Amazon_Reviews counts, maintained incrementally by the
+    ingest paths (see server_py/rollups.py). Missing key values are stored
+    as '' / -1 so every row has a concrete primary key to upsert on.
+    """
+    __tablename__ = "review_rollups"
+
+    category = Column(Text, primary_key=True)
+    marketplace = Column(Text, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Text, primary_key=True)
+    star_rating = Column(Integer, primary_key=True)
+    sentiment = Column(Text, primary_key=True)
+    review_count = Column(BigInteger, nullable=False, default=0)
+    rating_sum = Column(BigInteger, nullable=False, default=0)
 
 class Product(Base):
     __tablename__ = "products"  
@@ -117,9 +154,115 @@ class Product(Base):
     description = Column(Text, nullable=True)
     features = Column(JSON, nullable=True)
     specifications = Column(JSON, nullable=True)
+    # Fingerprint of PRODUCT_TRACKED_FIELDS; sync skips rows whose fingerprint is unchanged
+    content_hash = Column(String(40), nullable=True)
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+# Product columns that define "changed" for sync (not timestamps or bookkeeping)
+PRODUCT_TRACKED_FIELDS = (
+    "source", "title", "brand", "category", "price", "currency", "original_price", "discount",
+    "rating", "reviews_count", "availability", "is_bestseller", "is_deal", "image_url", "product_url",
+)
+
+
+def product_fingerprint(values: dict) -> str:
+    """sha1 of the tracked fields of a product row, in PRODUCT_TRACKED_FIELDS order"""
+    payload = json.dumps([values.get(field) for field in PRODUCT_TRACKED_FIELDS], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class ProductPriceHistory(Base):
+    """
+    Append-only price observations, one row per price change (see
+    server_py/price_history.py). BRIN on observed_at keeps time-range scans
+    cheap on an insert-ordered table; the btree serves one product's range.
+    """
+    __tablename__ = "product_price_history"
+
+    id = Column(BigInteger, primary_key=True)
+    product_id = Column(String(100), nullable=False)  # products.product_id
+    price = Column(Float, nullable=False)
+    currency = Column(String(5))
+    observed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_price_history_product_time", "product_id", "observed_at"),
+        Index("ix_price_history_observed_brin", "observed_at", postgresql_using="brin"),
+    )
+
+class ProductPriceRollup(Base):
+    """Daily and weekly min/avg/max/close of product_price_history, kept current on append"""
+    __tablename__ = "product_price_rollups"
+
+    product_id = Column(String(100), primary_key=True)
+    bucket = Column(String(10), primary_key=True)  # 'day' or 'week'
+    bucket_start = Column(Date, primary_key=True)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    price_sum = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False)
+    last_price = Column(Float, nullable=False)
+    last_observed_at = Column(DateTime, nullable=False)
+
+class ProductForecast(Base):
+    """Latest next-price forecast per product, written by server_py/forecasting.py"""
+    __tablename__ = "product_forecasts"
+
+    product_id = Column(Integer, primary_key=True)  # products.id
+    title = Column(Text)
+    forecast_price = Column(Float, nullable=False, index=True)
+    currency = Column(String(5))
+    model = Column(String(50))
+    history_points = Column(Integer)
+    generated_at = Column(DateTime, default=datetime.utcnow)
+
+class DataVersion(Base):
+    """Per-table change counter, bumped by every write path in the same transaction"""
+    __tablename__ = "data_versions"
+
+    table_name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class SyncRun(Base):
+    """Category crawl checkpoint, one row per category per run (see server_py/category_crawler.py)"""
+    __tablename__ = "sync_runs"
+
+    run_id = Column(String(40), primary_key=True)
+    category = Column(String(100), primary_key=True)
+    last_page = Column(Integer, nullable=False, default=0)  # last page saved
+    cursor = Column(String(500))  # pagination token from the last page, when the API returns one
+    status = Column(String(20), nullable=False, default="running")  # running | done | failed
+    attempts = Column(Integer, nullable=False, default=0)  # consecutive failed tries of the next page
+    items = Column(Integer, nullable=False, default=0)
+    new_items = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_sync_runs_status_updated", "status", "updated_at"),
+    )
+
+class SchedulerJob(Base):
+    """Queue and run log of scheduler jobs; the API enqueues, the scheduler worker runs (server_py/schedule.py)"""
+    __tablename__ = "scheduler_jobs"
+
+    id = Column(BigInteger, primary_key=True)
+    job_name = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | succeeded | failed
+    trigger = Column(String(20), nullable=False, default="api")  # api | schedule
+    worker = Column(String(100))  # host:pid that ran it
+    requested_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    result = Column(Text)  # JSON
+    error = Column(Text)
+
+    __table_args__ = (
+        Index("ix_scheduler_jobs_status_requested", "status", "requested_at"),
+        Index("ix_scheduler_jobs_name_started", "job_name", "started_at"),
+    )
+
 class Review(Base):
     __tablename__ = "reviews"
     
@@ -175,4 +318,4 @@ class User(Base):
     business_interests = Column(ARRAY(String))
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
-    is_active = Column(Boolean, default=True)
\ No newline at end of file
+    is_active = Column(Boolean, default=True)
@@ -0,0 +1,67 @@
+# ============================================
+# Ollama-compatible stub server
+# ============================================
+# File: server_py/ollama_stub.py
+#
+# Streams a canned answer from POST /api/generate one word at a time, so
+# /ai/query can be exercised without a model:
+#
+#     python -m server_py.ollama_stub --port 11435 --delay 0.05
+#     OLLAMA_BASE_URL=http://127.0.0.1:11435 make run
+#
+# It logs when a client disconnects mid-answer, to check cancellation.
+
+import argparse
+import asyncio
+import json
+import logging
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger("ollama_stub")
+
+app = FastAPI(title="Ollama stub")
+app.state.delay = 0.05
+app.state.answer = "This is a stubbed answer streamed one word at a time from the local test server."
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    body = await request.json()
+    words = app.state.answer.split(" ")
+
+    async def chunks():
+        sent = 0
+        try:
+            for i, word in enumerate(words):
+                await asyncio.sleep(app.state.delay)
+                token = word if i == 0 else " " + word
+                yield json.dumps({"model": body.get("model"), "response": token, "done": False}) + "\n"
+                sent += 1
+            yield json.dumps({"model": body.get("model"), "response": "", "done": True}) + "\n"
+        except asyncio.CancelledError:
+            logger.warning(f"Client disconnected after {sent}/{len(words)} tokens; generation cancelled")
+            raise
+
+    if not body.get("stream", True):
+        return {"model": body.get("model"), "response": app.state.answer, "done": True}
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+@app.get("/api/tags")
+def tags():
+    return {"models": [{"name": "stub"}]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ollama-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds between tokens")
+    args = parser.parse_args()
+
+    app.state.delay = args.delay
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(app, host=args.host, port=args.port)
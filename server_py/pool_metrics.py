@@ -0,0 +1,121 @@
+# ============================================
+# Connection pool instrumentation
+# ============================================
+# File: server_py/pool_metrics.py
+#
+# Times how long each pool checkout waits for a connection, per engine and
+# per HTTP request, and exposes pool occupancy gauges. A request that waits
+# on the pool is queueing for a connection, not for the database.
+
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Checkout waits recorded during the current request (set by pool_wait_middleware)
+_request_waits: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_pool_waits", default=None)
+
+
+class WaitStats:
+    """Counters plus a sliding window of recent samples for percentiles"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self._recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total, max_seconds, timeouts = self.count, self.total_seconds, self.max_seconds, self.timeouts
+        pct = lambda p: round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 3) if recent else None
+        return {
+            "count": count,
+            "timeouts": timeouts,
+            "mean_ms": round(total / count * 1000, 3) if count else None,
+            "max_ms": round(max_seconds * 1000, 3),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+        }
+
+
+# Per-engine checkout waits and per-request total waits
+checkout_waits: Dict[str, WaitStats] = {}
+request_waits = WaitStats()
+
+
+class _TimedCheckout:
+    """Mixin timing QueuePool._do_get, which blocks while the pool is exhausted"""
+
+    metrics_name = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            checkout_waits.setdefault(self.metrics_name, WaitStats()).timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            checkout_waits.setdefault(self.metrics_name, WaitStats()).record(waited)
+            waits = _request_waits.get()
+            if waits is not None:
+                waits.append(waited)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    metrics_name = "sync"
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+
+def pool_gauges(engine) -> Dict[str, Any]:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": getattr(pool, "_max_overflow", None),
+        "timeout": pool.timeout(),
+    }
+
+
+def pool_status(**engines) -> Dict[str, Any]:
+    return {
+        "pools": {name: pool_gauges(engine) for name, engine in engines.items()},
+        "checkout_wait": {name: stats.snapshot() for name, stats in checkout_waits.items()},
+        "request_wait": request_waits.snapshot(),
+    }
+
+
+async def pool_wait_middleware(request, call_next):
+    """Sum the pool waits of one request; report it as a Server-Timing header"""
+    waits: list = []
+    token = _request_waits.set(waits)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_waits.reset(token)
+    if waits:
+        total = sum(waits)
+        request_waits.record(total)
+        response.headers["Server-Timing"] = f"db-pool;dur={total * 1000:.2f}"
+    return response
@@ -0,0 +1,111 @@
+# ============================================
+# Append-only product price history
+# ============================================
+# File: server_py/price_history.py
+#
+# save_product / save_products append a row to product_price_history only when
+# a product's price actually changes, and fold it into the daily/weekly
+# rollups in the same transaction. Forecasting and price trend charts read
+# the rollups.
+
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .database_config import SessionLocal, engine
+from . import models
+
+BUCKETS = ("day", "week")
+
+BACKFILL_SQL = """
+INSERT INTO product_price_history (product_id, price, currency, observed_at)
+SELECT product_id, price, currency, COALESCE(last_updated, created_at, now())
+FROM products
+WHERE product_id IS NOT NULL AND price IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM product_price_history h WHERE h.product_id = products.product_id)
+"""
+
+REBUILD_ROLLUPS_SQL = """
+INSERT INTO product_price_rollups
+    (product_id, bucket, bucket_start, min_price, max_price, price_sum, samples, last_price, last_observed_at)
+SELECT product_id, :bucket, date_trunc(:bucket, observed_at)::date,
+       MIN(price), MAX(price), SUM(price), COUNT(*),
+       (ARRAY_AGG(price ORDER BY observed_at DESC))[1], MAX(observed_at)
+FROM product_price_history
+GROUP BY product_id, date_trunc(:bucket, observed_at)
+"""
+
+
+def bucket_start(bucket: str, observed_at: datetime) -> date:
+    day = observed_at.date()
+    return day - timedelta(days=day.weekday()) if bucket == "week" else day
+
+
+def record_price(db: Session, product_id: str, price: float, currency: Optional[str] = None,
+                 observed_at: Optional[datetime] = None) -> None:
+    """
+    Append one observation and update its day/week rollups. Does not commit:
+    call from a write path so history and product land in one transaction.
+    """
+    record_prices(db, [(product_id, price, currency)], observed_at)
+
+
+def record_prices(db: Session, observations: List[Tuple[str, float, Optional[str]]],
+                  observed_at: Optional[datetime] = None) -> None:
+    """
+    Batch form of record_price for (product_id, price, currency) tuples with
+    distinct product ids: one history INSERT plus one rollup upsert per bucket.
+    """
+    if not observations:
+        return
+    observed_at = observed_at or datetime.utcnow()
+    db.execute(insert(models.ProductPriceHistory), [
+        {"product_id": product_id, "price": price, "currency": currency, "observed_at": observed_at}
+        for product_id, price, currency in observations
+    ])
+
+    R = models.ProductPriceRollup
+    for bucket in BUCKETS:
+        stmt = insert(R).values([
+            dict(product_id=product_id, bucket=bucket, bucket_start=bucket_start(bucket, observed_at),
+                 min_price=price, max_price=price, price_sum=price, samples=1,
+                 last_price=price, last_observed_at=observed_at)
+            for product_id, price, _ in observations
+        ])
+        newer = stmt.excluded.last_observed_at >= R.last_observed_at
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[R.product_id, R.bucket, R.bucket_start],
+            set_={
+                "min_price": func.least(R.min_price, stmt.excluded.min_price),
+                "max_price": func.greatest(R.max_price, stmt.excluded.max_price),
+                "price_sum": R.price_sum + stmt.excluded.price_sum,
+                "samples": R.samples + stmt.excluded.samples,
+                "last_price": case((newer, stmt.excluded.last_price), else_=R.last_price),
+                "last_observed_at": func.greatest(R.last_observed_at, stmt.excluded.last_observed_at),
+            },
+        )
+        db.execute(stmt)
+
+
+def backfill_from_products(db: Session) -> int:
+    """Seed one observation per product that has no history yet, then rebuild the rollups"""
+    inserted = db.execute(text(BACKFILL_SQL)).rowcount
+    db.execute(text("DELETE FROM product_price_rollups"))
+    for bucket in BUCKETS:
+        db.execute(text(REBUILD_ROLLUPS_SQL), {"bucket": bucket})
+    db.commit()
+    return inserted
+
+
+if __name__ == "__main__":
+    # Backfill: python -m server_py.price_history
+    models.Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        print(f"Backfilled {backfill_from_products(db)} price observations.")
+    finally:
+        db.close()
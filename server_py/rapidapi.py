@@ -7,9 +7,12 @@ import requests
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime
+from urllib.parse import urlsplit
 import os
 from dotenv import load_dotenv
 
+from server_py.http_cache import response_cache
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -26,12 +29,32 @@ class RapidAPIClient:
             "X-RapidAPI-Key": self.api_key,
             "X-RapidAPI-Host": self.amazon_host
         }
+
+        # Keep-alive connection pool, reused across calls to the same host
+        self.session = requests.Session()
+
+    def _get_json(self, url: str, headers: Dict, params: Dict, use_cache: bool = True) -> Dict:
+        """
+        GET through the on-disk response cache (see http_cache); raises on HTTP errors.
+        use_cache=False always calls the API and leaves the cache untouched (health checks).
+        """
+        parts = urlsplit(url)
+        if use_cache:
+            cached = response_cache.lookup(parts.netloc, parts.path, params)
+            if cached is not None:
+                return cached
+        response = self.session.get(url, headers=headers, params=params, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        if use_cache:
+            response_cache.store(parts.netloc, parts.path, params, data)
+        return data
         
     # ============================================
     # AMAZON API METHODS
     # ============================================
     
-    def search_amazon_products(self, query: str, page: int = 1) -> Dict:
+    def search_amazon_products(self, query: str, page: int = 1, use_cache: bool = True) -> Dict:
         """Search Amazon products by query"""
         url = f"https://{self.amazon_host}/search"
         
@@ -43,9 +66,7 @@ class RapidAPIClient:
         
         try:
             logger.info(f"Searching Amazon for: {query}")
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(url, self.headers, params, use_cache)
             logger.info(f"Found {len(data.get('results', []))} products")
             return data
         except Exception as e:
@@ -60,9 +81,7 @@ class RapidAPIClient:
         
         try:
             logger.info(f"Fetching Amazon product details: {asin}")
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, self.headers, params)
         except Exception as e:
             logger.error(f"Error fetching product details: {str(e)}")
             return {"error": str(e)}
@@ -79,9 +98,7 @@ class RapidAPIClient:
         
         try:
             logger.info(f"Fetching reviews for: {asin}")
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, self.headers, params)
         except Exception as e:
             logger.error(f"Error fetching reviews: {str(e)}")
             return {"error": str(e), "reviews": []}
@@ -97,9 +114,7 @@ class RapidAPIClient:
         
         try:
             logger.info(f"Fetching best sellers: {category}")
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, self.headers, params)
         except Exception as e:
             logger.error(f"Error fetching best sellers: {str(e)}")
             return {"error": str(e), "results": []}
@@ -112,9 +127,7 @@ class RapidAPIClient:
         
         try:
             logger.info("Fetching Amazon deals")
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, self.headers, params)
         except Exception as e:
             logger.error(f"Error fetching deals: {str(e)}")
             return {"error": str(e), "deals": []}
@@ -131,9 +144,7 @@ class RapidAPIClient:
         
         try:
             logger.info(f"Fetching category products: {category}")
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, self.headers, params)
         except Exception as e:
             logger.error(f"Error fetching category: {str(e)}")
             return {"error": str(e), "results": []}
@@ -142,7 +153,7 @@ class RapidAPIClient:
     # FLIPKART API METHODS
     # ============================================
     
-    def search_flipkart_products(self, query: str, page: int = 1) -> Dict:
+    def search_flipkart_products(self, query: str, page: int = 1, use_cache: bool = True) -> Dict:
         """Search Flipkart products"""
         url = f"https://{self.flipkart_host}/search"
         
@@ -155,9 +166,7 @@ class RapidAPIClient:
         
         try:
             logger.info(f"Searching Flipkart for: {query}")
-            response = requests.get(url, headers=headers, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, headers, params, use_cache)
         except Exception as e:
             logger.error(f"Error searching Flipkart: {str(e)}")
             return {"error": str(e), "results": []}
@@ -175,9 +184,7 @@ class RapidAPIClient:
         
         try:
             logger.info(f"Fetching Flipkart product: {product_id}")
-            response = requests.get(url, headers=headers, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(url, headers, params)
         except Exception as e:
             logger.error(f"Error fetching product: {str(e)}")
             return {"error": str(e)}
@@ -0,0 +1,222 @@
+# ============================================
+# Concurrent RapidAPI client
+# ============================================
+# File: server_py/rapidapi_async.py
+#
+# asyncio counterpart of RapidAPIClient for bulk syncs:
+#   - one keep-alive httpx.AsyncClient (connection pool) per API host
+#   - a token bucket per host sized to the RapidAPI plan quota
+#     (RAPIDAPI_RATE_PER_SEC, RAPIDAPI_BURST); buckets are process-wide so
+#     consecutive syncs share the quota
+#   - retries on 429 / 5xx / network errors with jittered exponential
+#     backoff, honouring Retry-After
+#   - fan_out() runs many calls with bounded concurrency
+#   - responses go through the on-disk cache / replay store (http_cache), so
+#     cached and replayed pages cost neither a token nor a round trip
+# A full sync then runs at the quota's pace instead of the sum of round trips.
+#
+# Responses and error shapes match RapidAPIClient, so callers can switch.
+#
+#     async with AsyncRapidAPIClient() as client:
+#         pages = await client.fan_out([
+#             lambda c=c, p=p: client.get_amazon_category_products(c, p)
+#             for c in categories for p in range(1, 4)
+#         ])
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from server_py.http_cache import ReplayMiss, response_cache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RAPIDAPI_RATE_PER_SEC = float(os.getenv("RAPIDAPI_RATE_PER_SEC", "5"))
+RAPIDAPI_BURST = int(os.getenv("RAPIDAPI_BURST", "10"))
+RAPIDAPI_CONCURRENCY = int(os.getenv("RAPIDAPI_CONCURRENCY", "8"))
+RAPIDAPI_MAX_RETRIES = int(os.getenv("RAPIDAPI_MAX_RETRIES", "3"))
+RAPIDAPI_BACKOFF_BASE = float(os.getenv("RAPIDAPI_BACKOFF_BASE", "0.5"))
+RAPIDAPI_BACKOFF_MAX = float(os.getenv("RAPIDAPI_BACKOFF_MAX", "20"))
+RAPIDAPI_TIMEOUT = float(os.getenv("RAPIDAPI_TIMEOUT", "15"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; safe across threads and event loops"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _reserve(self) -> float:
+        """Take one token now or reserve the next one; returns seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            self.waited_seconds += delay
+            return delay
+
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+# One bucket per API host, shared by every client in the process
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def host_bucket(host: str) -> TokenBucket:
+    with _buckets_lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(RAPIDAPI_RATE_PER_SEC, RAPIDAPI_BURST)
+        return _buckets[host]
+
+
+class AsyncRapidAPIClient:
+    """Pooled, rate-limited, retrying RapidAPI client for asyncio code"""
+
+    def __init__(self, concurrency: int = RAPIDAPI_CONCURRENCY):
+        self.api_key = os.getenv("RAPIDAPI_KEY")
+        self.amazon_host = os.getenv("RAPIDAPI_HOST_AMAZON", "amazon-data-scraper.p.rapidapi.com")
+        self.flipkart_host = os.getenv("RAPIDAPI_HOST_FLIPKART", "flipkart-api.p.rapidapi.com")
+        self.concurrency = concurrency
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.requests = self.retries = self.failures = self.cached = 0
+
+    async def __aenter__(self) -> "AsyncRapidAPIClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    def _client(self, host: str) -> httpx.AsyncClient:
+        client = self._clients.get(host)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=f"https://{host}",
+                headers={"X-RapidAPI-Key": self.api_key or "", "X-RapidAPI-Host": host},
+                timeout=httpx.Timeout(RAPIDAPI_TIMEOUT),
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+            self._clients[host] = client
+        return client
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), RAPIDAPI_BACKOFF_MAX)
+        # Full jitter: spread retries so throttled callers do not retry in lockstep
+        return random.uniform(0, min(RAPIDAPI_BACKOFF_MAX, RAPIDAPI_BACKOFF_BASE * 2 ** attempt))
+
+    async def get(self, host: str, path: str, params: Dict[str, Any], empty_key: Optional[str] = None) -> Dict:
+        """GET with rate limiting and retries; errors come back as {"error": ..., empty_key: []}"""
+        error = "unknown error"
+        try:
+            cached = response_cache.lookup(host, path, params)
+        except ReplayMiss as e:
+            cached, error = None, str(e)
+        if cached is not None:
+            self.cached += 1
+            return cached
+        bucket = host_bucket(host)
+        # Replay mode never touches the network
+        for attempt in range(RAPIDAPI_MAX_RETRIES + 1 if response_cache.mode != "replay" else 0):
+            await bucket.acquire()
+            self.requests += 1
+            try:
+                response = await self._client(host).get(path, params=params)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    data = response.json()
+                    response_cache.store(host, path, params, data)
+                    return data
+                error = f"HTTP {response.status_code}"
+                delay = self._backoff(attempt, response.headers.get("retry-after"))
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+                delay = self._backoff(attempt)
+            except Exception as e:
+                error = str(e)
+                break
+            if attempt < RAPIDAPI_MAX_RETRIES:
+                self.retries += 1
+                logger.warning(f"RapidAPI {host}{path} failed ({error}); retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        self.failures += 1
+        logger.error(f"RapidAPI {host}{path} {params} failed: {error}")
+        result: Dict[str, Any] = {"error": error}
+        if empty_key:
+            result[empty_key] = []
+        return result
+
+    async def fan_out(self, calls: List[Callable[[], Awaitable[Any]]], concurrency: Optional[int] = None) -> List[Any]:
+        """Run call factories with at most `concurrency` in flight; results keep the input order"""
+        limit = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def bounded(call):
+            async with limit:
+                return await call()
+
+        return await asyncio.gather(*(bounded(call) for call in calls))
+
+    # ============================================
+    # AMAZON API METHODS
+    # ============================================
+
+    async def search_amazon_products(self, query: str, page: int = 1) -> Dict:
+        return await self.get(self.amazon_host, "/search", {"query": query, "page": page, "country": "IN"}, "results")
+
+    async def get_amazon_product_reviews(self, asin: str, page: int = 1) -> Dict:
+        return await self.get(self.amazon_host, "/reviews", {"asin": asin, "page": page, "country": "IN"}, "reviews")
+
+    async def get_amazon_best_sellers(self, category: str = "electronics") -> Dict:
+        return await self.get(self.amazon_host, "/bestsellers", {"category": category, "country": "IN"}, "results")
+
+    async def get_amazon_deals(self) -> Dict:
+        return await self.get(self.amazon_host, "/deals", {"country": "IN"}, "deals")
+
+    async def get_amazon_category_products(self, category: str, page: int = 1) -> Dict:
+        return await self.get(self.amazon_host, "/category", {"category": category, "page": page, "country": "IN"}, "results")
+
+    # ============================================
+    # FLIPKART API METHODS
+    # ============================================
+
+    async def search_flipkart_products(self, query: str, page: int = 1) -> Dict:
+        return await self.get(self.flipkart_host, "/search", {"query": query, "page": page}, "results")
+
+    async def get_flipkart_product_details(self, product_id: str) -> Dict:
+        return await self.get(self.flipkart_host, "/product", {"id": product_id})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "cached": self.cached,
+            "throttled_seconds": {host: round(b.waited_seconds, 2) for host, b in _buckets.items()},
+        }
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
@@ -0,0 +1,151 @@
+# ============================================
+# Incrementally maintained review rollups
+# ============================================
+# File: server_py/rollups.py
+#
+# review_rollups holds review counts and star-rating sums per (category,
+# marketplace, year, month, star_rating, sentiment). The distribution endpoints
+# read it instead of grouping Amazon_Reviews on every request. The ingest paths
+# (load_data.py) call apply_rollup_deltas in the same transaction as the review
+# insert, so the rollups stay in step with the table.
+#
+# Key columns are primary key columns, so they cannot be NULL: a missing value
+# is stored as NO_TEXT ('') or NO_INT (-1), and crud.py maps those back to
+# NULL with NULLIF. Unrated reviews are counted but add nothing to rating_sum.
+#
+# The initial build runs in python -m server_py.migrate. To recompute the table
+# from scratch (e.g. after editing Amazon_Reviews by hand):
+#
+#     python -m server_py.rollups        (make rebuild-rollups)
+
+import math
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .database_config import SessionLocal, engine
+from . import models
+from .cache import bump_version
+
+# Sentinels for missing key values (primary key columns cannot be NULL)
+NO_TEXT = ""
+NO_INT = -1
+
+ROLLUP_KEYS = ("category", "marketplace", "year", "month", "star_rating", "sentiment")
+
+# Amazon_Reviews attribute feeding each rollup key
+_SOURCE_FIELDS = {
+    "category": "product_category",
+    "marketplace": "market_place",
+    "year": "review_year",
+    "month": "review_month",
+    "star_rating": "star_rating",
+    "sentiment": "Sentiment_pc",
+}
+
+REBUILD_SQL = """
+INSERT INTO review_rollups
+    (category, marketplace, year, month, star_rating, sentiment, review_count, rating_sum)
+SELECT
+    COALESCE(product_category, :no_text),
+    COALESCE(market_place, :no_text),
+    COALESCE(review_year, :no_int),
+    COALESCE(review_month, :no_text),
+    COALESCE(star_rating, :no_int),
+    COALESCE("Sentiment_pc", :no_text),
+    COUNT(*),
+    COALESCE(SUM(star_rating), 0)
+FROM "Amazon_Reviews"
+GROUP BY 1, 2, 3, 4, 5, 6
+"""
+
+
+def _clean(value: Any, missing: Any) -> Any:
+    """Map None/NaN (pandas leaves NaN for empty CSV cells) to the key sentinel"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return missing
+    return value
+
+
+def rollup_key(review: Dict[str, Any]) -> Tuple:
+    """Build the rollup key for one review mapping (model attribute names)"""
+    key = []
+    for name in ROLLUP_KEYS:
+        missing = NO_INT if name in ("year", "star_rating") else NO_TEXT
+        value = _clean(review.get(_SOURCE_FIELDS[name]), missing)
+        if missing == NO_INT:
+            value = int(value)
+        else:
+            value = str(value)
+        key.append(value)
+    return tuple(key)
+
+
+def rollup_deltas(reviews: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold newly inserted reviews into one count/rating-sum delta per rollup key"""
+    rating_index = ROLLUP_KEYS.index("star_rating")
+    deltas: Dict[Tuple, List[int]] = {}
+    for review in reviews:
+        key = rollup_key(review)
+        delta = deltas.setdefault(key, [0, 0])
+        delta[0] += 1
+        if key[rating_index] != NO_INT:
+            delta[1] += key[rating_index]
+
+    return [
+        dict(zip(ROLLUP_KEYS, key), review_count=count, rating_sum=rating_sum)
+        for key, (count, rating_sum) in deltas.items()
+    ]
+
+
+def apply_rollup_deltas(db: Session, reviews: Iterable[Dict[str, Any]]) -> int:
+    """
+    Add newly inserted reviews to review_rollups. Does not commit, so the
+    rollup update lands in the same transaction as the review insert.
+    Returns the number of rollup rows touched.
+    """
+    rows = rollup_deltas(reviews)
+    if not rows:
+        return 0
+
+    stmt = insert(models.ReviewRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEYS),
+        set_={
+            "review_count": models.ReviewRollup.review_count + stmt.excluded.review_count,
+            "rating_sum": models.ReviewRollup.rating_sum + stmt.excluded.rating_sum,
+        },
+    )
+    db.execute(stmt)
+    return len(rows)
+
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute review_rollups from scratch with one GROUP BY over Amazon_Reviews"""
+    db.execute(text("DELETE FROM review_rollups"))
+    db.execute(text(REBUILD_SQL), {"no_text": NO_TEXT, "no_int": NO_INT})
+    count = db.query(models.ReviewRollup).count()
+    bump_version(db, "Amazon_Reviews")
+    db.commit()
+    return count
+
+
+def ensure_rollups(db: Session) -> None:
+    """Build the rollups once if the table is empty but reviews already exist"""
+    has_rollups = db.execute(text("SELECT 1 FROM review_rollups LIMIT 1")).first()
+    has_reviews = db.execute(text('SELECT 1 FROM "Amazon_Reviews" LIMIT 1')).first()
+    if has_reviews and not has_rollups:
+        rebuild_rollups(db)
+
+
+if __name__ == "__main__":
+    # Rebuild: python -m server_py.rollups
+    models.Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt review_rollups: {rebuild_rollups(db)} rows.")
+    finally:
+        db.close()
@@ -74,6 +74,7 @@ import bcrypt
 from datetime import datetime
 from typing import List
 
+from ..bulkhead import bulkheads
 from ..database_config import get_db
 from ..models import User
 from ..schemas import UserCreate, UserOut
@@ -106,10 +107,15 @@ def current_timestamp() -> datetime:
 
 
 @router.post("/signup", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, db: Session = Depends(get_db)):
     """
     Create a new user with hashed password and formatted business interests.
+    bcrypt runs on the "auth" bulkhead, not the shared threadpool.
     """
+    return await bulkheads["auth"].run(create_user, user, db)
+
+
+def create_user(user: UserCreate, db: Session):
     # Check if email already exists
     existing_user = db.query(User).filter(User.email == user.email).first()
     if existing_user:
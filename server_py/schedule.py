@@ -1,12 +1,32 @@
 # ============================================
 # File: server_py/schedule.py (UPDATED)
 # ============================================
+#
+# Scheduled jobs run in a dedicated worker process (server_py/scheduler_worker.py),
+# never inside the API workers. The API only enqueues jobs (enqueue_job), and the
+# worker picks them up from the scheduler_jobs table.
+#
+# Every run takes a Postgres advisory lock named after the job, so with several
+# workers (or one started twice) each job runs on one instance at a time. It also
+# opens a session for the run and passes it to the job with the run's row. A scheduled firing is skipped when another
+# instance already ran the job for that slot: within SCHEDULER_DEDUPE_SECONDS
+# for cron jobs, or within 90% of the interval for interval jobs (whose timers
+# start whenever each worker starts).
+#
+# Sync jobs publish their pipeline stats to their scheduler_jobs row while they
+# run (PipelineProgress), so the API can serve GET /sync/pipeline/status.
 
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+import hashlib
+import json
 import logging
+import os
+import socket
+from typing import Any, Dict, Optional
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,103 +34,268 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-scheduler = BackgroundScheduler(timezone='Asia/Kolkata')
+SCHEDULER_TIMEZONE = 'Asia/Kolkata'
+SCHEDULER_POLL_SECONDS = int(os.getenv("SCHEDULER_POLL_SECONDS", "5"))
+SCHEDULER_DEDUPE_SECONDS = int(os.getenv("SCHEDULER_DEDUPE_SECONDS", "300"))
 
-def sync_all_data():
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+scheduler = BlockingScheduler(timezone=SCHEDULER_TIMEZONE)
+
+# Jobs that run a SyncPipeline (their rows carry the pipeline stats)
+SYNC_JOBS = ("full_sync", "amazon_sync", "flipkart_sync")
+
+class PipelineProgress:
+    """SyncPipeline on_progress callback: stores the stats on the job's scheduler_jobs row"""
+
+    def __init__(self, db, job):
+        self.db = db
+        self.job = job
+        self.stats: Optional[Dict[str, Any]] = None
+
+    def __call__(self, stats: Dict[str, Any]) -> None:
+        self.stats = stats
+        self.job.result = json.dumps({"pipeline": stats}, default=str)
+        self.db.commit()
+
+# --------------------------
+# Jobs: each takes the run's own session and its scheduler_jobs row.
+# The sync jobs use the session only to publish progress on that row.
+# data_sync_service opens its own sessions: one per pipeline write worker
+# and one for crawl checkpoints, because those run on several threads at once.
+# --------------------------
+
+def sync_all_data(db, job):
     """Sync all data from RapidAPI - Runs on schedule"""
     from server_py.database_sync_service import data_sync_service
-    
+
     logger.info("\n" + "="*70)
     logger.info(f"🔄 SCHEDULED DATA SYNC STARTED - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info("="*70)
-    
-    try:
-        result = data_sync_service.full_sync()
-        
-        logger.info("\n" + "="*70)
-        logger.info("✅ SCHEDULED DATA SYNC COMPLETED SUCCESSFULLY")
-        logger.info(f"📊 Total items synced: {result.get('total', 0)}")
-        logger.info(f"⏱️  Duration: {result.get('duration', 0):.2f} seconds")
-        logger.info("="*70 + "\n")
-        
-    except Exception as e:
-        logger.error("\n" + "="*70)
-        logger.error(f"❌ SCHEDULED DATA SYNC FAILED: {str(e)}")
-        logger.error("="*70 + "\n")
-        import traceback
-        logger.error(traceback.format_exc())
 
-def sync_amazon_only():
+    progress = PipelineProgress(db, job)
+    result = data_sync_service.full_sync(on_progress=progress)
+
+    logger.info("\n" + "="*70)
+    logger.info("✅ SCHEDULED DATA SYNC COMPLETED SUCCESSFULLY")
+    logger.info(f"📊 Total items synced: {result.get('total', 0)}")
+    logger.info(f"🧮 Products new/changed/unchanged: {result.get('new', 0)}/{result.get('changed', 0)}/{result.get('unchanged', 0)}")
+    logger.info(f"⏱️  Duration: {result.get('duration', 0):.2f} seconds")
+    logger.info("="*70 + "\n")
+    return {**result, "pipeline": progress.stats}
+
+def sync_amazon_only(db, job):
     """Sync only Amazon data - Quick sync"""
     from server_py.database_sync_service import data_sync_service
-    
+
     logger.info("🔄 Quick Amazon sync started...")
-    try:
-        data_sync_service.sync_amazon_products_by_search()
-        logger.info("✅ Quick Amazon sync completed")
-    except Exception as e:
-        logger.error(f"❌ Amazon sync failed: {e}")
+    progress = PipelineProgress(db, job)
+    count = data_sync_service.sync_amazon_products_by_search(on_progress=progress)
+    logger.info("✅ Quick Amazon sync completed")
+    return {"products_synced": count, "pipeline": progress.stats}
 
-def sync_flipkart_only():
+def sync_flipkart_only(db, job):
     """Sync only Flipkart data - Quick sync"""
     from server_py.database_sync_service import data_sync_service
-    
+
     logger.info("🔄 Quick Flipkart sync started...")
-    try:
-        data_sync_service.sync_flipkart_products()
-        logger.info("✅ Quick Flipkart sync completed")
-    except Exception as e:
-        logger.error(f"❌ Flipkart sync failed: {e}")
+    progress = PipelineProgress(db, job)
+    count = data_sync_service.sync_flipkart_products(on_progress=progress)
+    logger.info("✅ Quick Flipkart sync completed")
+    return {"products_synced": count, "pipeline": progress.stats}
+
+def refresh_forecasts_job(db, job):
+    """Retrain price forecasts and store them in product_forecasts"""
+    from server_py.forecasting import refresh_forecasts
+
+    logger.info("🔮 Forecast refresh started...")
+    result = refresh_forecasts(db)
+    logger.info(f"✅ Forecast refresh completed: {result['products']} products ({result['model']})")
+    return result
+
+# job name -> (function, trigger, display name)
+JOBS: Dict[str, tuple] = {
+    # Full sync twice daily (9 AM and 9 PM)
+    "full_sync": (sync_all_data, CronTrigger(hour='9,21', minute=0, timezone=SCHEDULER_TIMEZONE),
+                  'Full Data Sync (Amazon + Flipkart)'),
+    # Quick Amazon sync every 6 hours
+    "amazon_sync": (sync_amazon_only, IntervalTrigger(hours=6), 'Quick Amazon Sync'),
+    # Quick Flipkart sync every 8 hours
+    "flipkart_sync": (sync_flipkart_only, IntervalTrigger(hours=8), 'Quick Flipkart Sync'),
+    # Forecast refresh after the evening full sync
+    "forecast_refresh": (refresh_forecasts_job, CronTrigger(hour=23, minute=0, timezone=SCHEDULER_TIMEZONE),
+                         'Price Forecast Refresh'),
+}
+
+# --------------------------
+# Locking and bookkeeping
+# --------------------------
+
+def job_lock_key(job_name: str) -> int:
+    """Stable signed 64-bit advisory lock key for a job name"""
+    return int.from_bytes(hashlib.sha1(f"scheduler:{job_name}".encode()).digest()[:8], "big", signed=True)
+
+def dedupe_window(trigger) -> timedelta:
+    """How recent a scheduled run must be for another instance's firing to be skipped"""
+    if isinstance(trigger, IntervalTrigger):
+        return trigger.interval * 0.9
+    return timedelta(seconds=SCHEDULER_DEDUPE_SECONDS)
+
+def job_dict(job) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "job_name": job.job_name,
+        "status": job.status,
+        "trigger": job.trigger,
+        "worker": job.worker,
+        "requested_at": job.requested_at.isoformat() if job.requested_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+    }
+
+def run_job(job_name: str, trigger: str = "schedule", job_id: Optional[int] = None) -> Optional[str]:
+    """
+    Run one job under its advisory lock with a session of its own. job_id runs
+    a queued request; otherwise a scheduled run is recorded. Returns the final
+    status, or None when the job was skipped (locked, deduplicated or claimed).
+    """
+    from server_py.database_config import SessionLocal, engine
+    from server_py.models import SchedulerJob
+
+    fn, schedule_trigger, _ = JOBS[job_name]
+    # The lock lives on its own connection so the job's commits cannot release it
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(select(func.pg_try_advisory_lock(job_lock_key(job_name)))).scalar():
+            logger.info(f"⏭️  {job_name} is running on another instance; skipped")
+            return None
+        lock_conn.commit()
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            # Holding the lock means no run of this job is live: older "running" rows are orphans
+            db.query(SchedulerJob).filter(SchedulerJob.job_name == job_name, SchedulerJob.status == "running").update(
+                {"status": "failed", "finished_at": now, "error": "worker exited before the job finished"},
+                synchronize_session=False,
+            )
+            if job_id is None:
+                recent = db.query(SchedulerJob.id).filter(
+                    SchedulerJob.job_name == job_name,
+                    SchedulerJob.trigger == "schedule",
+                    SchedulerJob.started_at >= now - dedupe_window(schedule_trigger),
+                ).first()
+                if recent:
+                    db.commit()
+                    logger.info(f"⏭️  {job_name} already ran for this schedule slot; skipped")
+                    return None
+                job = SchedulerJob(job_name=job_name, trigger=trigger, status="running",
+                                   worker=WORKER_ID, requested_at=now, started_at=now)
+                db.add(job)
+            else:
+                claimed = db.query(SchedulerJob).filter(SchedulerJob.id == job_id, SchedulerJob.status == "queued").update(
+                    {"status": "running", "worker": WORKER_ID, "started_at": now}, synchronize_session=False
+                )
+                if not claimed:
+                    db.commit()
+                    return None
+                job = db.get(SchedulerJob, job_id)
+            db.commit()
+
+            try:
+                result = fn(db, job)
+                db.rollback()  # discard anything the job left uncommitted
+                job.status, job.result = "succeeded", json.dumps(result, default=str)
+            except Exception as e:
+                db.rollback()
+                logger.exception(f"❌ Job {job_name} failed: {e}")
+                job.status, job.error = "failed", str(e)
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            return job.status
+        finally:
+            db.close()
+            lock_conn.execute(select(func.pg_advisory_unlock(job_lock_key(job_name))))
+            lock_conn.commit()
+
+def run_queued_jobs() -> int:
+    """Run jobs the API enqueued, oldest first; returns how many ran"""
+    from server_py.database_config import SessionLocal
+    from server_py.models import SchedulerJob
+
+    with SessionLocal() as db:
+        queued = db.query(SchedulerJob.id, SchedulerJob.job_name).filter(
+            SchedulerJob.status == "queued"
+        ).order_by(SchedulerJob.requested_at).all()
+    ran = 0
+    for job_id, job_name in queued:
+        if job_name not in JOBS:
+            logger.error(f"Unknown queued job {job_name!r} (id {job_id})")
+            continue
+        ran += run_job(job_name, "api", job_id) is not None
+    return ran
+
+def enqueue_job(db, job_name: str) -> Dict[str, Any]:
+    """Queue a job for the scheduler worker; an identical job already waiting is reused"""
+    from server_py.models import SchedulerJob
+
+    if job_name not in JOBS:
+        raise ValueError(f"Unknown job {job_name!r}; expected one of {sorted(JOBS)}")
+    job = db.query(SchedulerJob).filter(
+        SchedulerJob.job_name == job_name, SchedulerJob.status == "queued"
+    ).first()
+    if job is None:
+        job = SchedulerJob(job_name=job_name, trigger="api", status="queued", requested_at=datetime.utcnow())
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info(f"📥 Queued {job_name} (id {job.id})")
+    return job_dict(job)
+
+def get_job(db, job_id: int) -> Optional[Dict[str, Any]]:
+    from server_py.models import SchedulerJob
+
+    job = db.get(SchedulerJob, job_id)
+    return job_dict(job) if job else None
+
+# --------------------------
+# Worker process
+# --------------------------
 
 def start_scheduler():
-    """Start scheduler with data sync jobs"""
+    """Start the blocking scheduler with data sync jobs (worker process only)"""
     logger.info("\n" + "="*70)
-    logger.info("🚀 STARTING SCHEDULER SERVICE")
+    logger.info(f"🚀 STARTING SCHEDULER WORKER {WORKER_ID}")
     logger.info("="*70)
-    
-    # Job 1: Full sync twice daily (9 AM and 9 PM)
-    scheduler.add_job(
-        func=sync_all_data,
-        trigger=CronTrigger(hour='9,21', minute=0),
-        id='full_sync_twice_daily',
-        name='Full Data Sync (Amazon + Flipkart)',
-        replace_existing=True,
-        max_instances=1
-    )
-    logger.info("✅ Scheduled: Full Data Sync at 9:00 AM & 9:00 PM daily")
-    
-    # Job 2: Quick Amazon sync every 6 hours
-    scheduler.add_job(
-        func=sync_amazon_only,
-        trigger=IntervalTrigger(hours=6),
-        id='amazon_sync_6h',
-        name='Quick Amazon Sync',
-        replace_existing=True,
-        max_instances=1
-    )
-    logger.info("✅ Scheduled: Amazon Sync every 6 hours")
-    
-    # Job 3: Quick Flipkart sync every 8 hours
+
+    for job_name, (_, trigger, name) in JOBS.items():
+        scheduler.add_job(
+            func=run_job,
+            args=[job_name],
+            trigger=trigger,
+            id=job_name,
+            name=name,
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        logger.info(f"✅ Scheduled: {name} ({trigger})")
+
+    # Jobs enqueued through the API
     scheduler.add_job(
-        func=sync_flipkart_only,
-        trigger=IntervalTrigger(hours=8),
-        id='flipkart_sync_8h',
-        name='Quick Flipkart Sync',
+        func=run_queued_jobs,
+        trigger=IntervalTrigger(seconds=SCHEDULER_POLL_SECONDS),
+        id='queued_jobs',
+        name='Run Queued Jobs',
         replace_existing=True,
-        max_instances=1
+        max_instances=1,
+        coalesce=True
     )
-    logger.info("✅ Scheduled: Flipkart Sync every 8 hours")
-    
-    scheduler.start()
-    
-    # Show next run times
-    logger.info("\n📅 Next Scheduled Runs:")
-    for job in scheduler.get_jobs():
-        logger.info(f"  - {job.name}: {job.next_run_time}")
-    
-    logger.info("\n✅ Scheduler started successfully!")
+    logger.info(f"✅ Polling queued jobs every {SCHEDULER_POLL_SECONDS}s")
     logger.info("="*70 + "\n")
 
+    scheduler.start()
+
 def stop_scheduler():
     """Stop the scheduler gracefully"""
     try:
@@ -122,32 +307,47 @@ def stop_scheduler():
     except Exception as e:
         logger.error(f"Error stopping scheduler: {e}")
 
-def get_scheduler_status():
-    """Get current scheduler status and job information"""
-    if not scheduler.running:
-        return {
-            "running": False,
-            "message": "Scheduler is not running",
-            "jobs": []
-        }
-    
-    jobs_info = []
-    for job in scheduler.get_jobs():
-        jobs_info.append({
-            "id": job.id,
-            "name": job.name,
-            "next_run": str(job.next_run_time),
-            "trigger": str(job.trigger)
-        })
-    
+# --------------------------
+# API side
+# --------------------------
+
+def get_scheduler_status(db, limit: int = 20):
+    """Scheduled jobs plus queued, running and recent runs from scheduler_jobs"""
+    from server_py.models import SchedulerJob
+
+    def rows(*criteria):
+        query = db.query(SchedulerJob).filter(*criteria).order_by(SchedulerJob.requested_at.desc())
+        return [job_dict(job) for job in query.limit(limit)]
+
+    jobs_info = [
+        {"id": job_name, "name": name, "trigger": str(trigger)}
+        for job_name, (_, trigger, name) in JOBS.items()
+    ]
     return {
-        "running": True,
-        "message": "Scheduler is running",
+        "message": "Jobs run in the scheduler worker (python -m server_py.scheduler_worker)",
         "total_jobs": len(jobs_info),
-        "jobs": jobs_info
+        "jobs": jobs_info,
+        "running": rows(SchedulerJob.status == "running"),
+        "queued": rows(SchedulerJob.status == "queued"),
+        "recent": rows(SchedulerJob.status.in_(["succeeded", "failed"])),
     }
 
-def trigger_manual_sync():
-    """Manually trigger a full sync (useful for testing)"""
+def get_pipeline_status(db) -> Dict[str, Any]:
+    """Pipeline stats of the running sync job, or of the most recent one"""
+    from server_py.models import SchedulerJob
+
+    query = db.query(SchedulerJob).filter(SchedulerJob.job_name.in_(SYNC_JOBS), SchedulerJob.started_at.isnot(None))
+    job = (
+        query.filter(SchedulerJob.status == "running").order_by(SchedulerJob.started_at.desc()).first()
+        or query.order_by(SchedulerJob.started_at.desc()).first()
+    )
+    if job is None:
+        return {"running": False, "message": "No sync has run yet"}
+    info = job_dict(job)
+    pipeline = (info.pop("result") or {}).get("pipeline") or {}
+    return {**pipeline, "running": job.status == "running", "job": info}
+
+def trigger_manual_sync(db) -> Dict[str, Any]:
+    """Queue a full sync for the scheduler worker"""
     logger.info("🔧 Manual sync triggered")
-    sync_all_data()
\ No newline at end of file
+    return enqueue_job(db, "full_sync")
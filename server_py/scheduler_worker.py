@@ -0,0 +1,34 @@
+# ============================================
+# Scheduler worker process
+# ============================================
+# File: server_py/scheduler_worker.py
+#
+# Runs the scheduled sync and forecast jobs, and the jobs queued through the
+# API, outside the API process:
+#
+#     python -m server_py.scheduler_worker        (make worker)
+#
+# Like the API, it expects the schema to be current (python -m server_py.migrate).
+#
+# Several workers may run at once; advisory locks in schedule.run_job make
+# each job run on only one of them at a time.
+
+import logging
+import signal
+
+from server_py.schedule import start_scheduler, stop_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    # pm2 / systemd stop with SIGTERM: finish the running job, then exit
+    signal.signal(signal.SIGTERM, lambda *_: stop_scheduler())
+    try:
+        start_scheduler()
+    except (KeyboardInterrupt, SystemExit):
+        stop_scheduler()
+
+
+if __name__ == "__main__":
+    main()
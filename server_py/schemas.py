@@ -86,6 +86,22 @@ class AmazonReview(BaseModel):
     class Config:
         from_attributes = True
 
+class ReviewPage(BaseModel):
+    items: List[AmazonReview]
+    next_cursor: Optional[str]
+    limit: int
+
+class ReviewSearchHit(AmazonReview):
+    rank: float
+    snippet: Optional[str]
+
+class ReviewSearchPage(BaseModel):
+    query: str
+    items: List[ReviewSearchHit]
+    limit: int
+    offset: int
+    next_offset: Optional[int]
+
 class Product(BaseModel):
     id: int
     asin: str
@@ -0,0 +1,76 @@
+# ============================================
+# Single-flight request coalescing
+# ============================================
+# File: server_py/single_flight.py
+#
+# Concurrent identical requests (same key: route plus normalized params) wait
+# on one in-flight computation and share its result, so a burst of dashboard
+# tabs costs one query or one LLM call instead of one per tab. Nothing is
+# kept after the computation finishes; caching is cache.py's job.
+#
+# Coalescing is per worker process (one event loop). The shared computation
+# runs in its own task and its own DB session, so a caller that goes away
+# does not cancel it for the others.
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from .database_config import run_in_thread
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executed: Dict[str, int] = defaultdict(int)
+        self.coalesced: Dict[str, int] = defaultdict(int)
+
+    async def do(self, key: Tuple[Hashable, ...], fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() once per key at a time; key[0] names the route for the metrics"""
+        route = str(key[0])
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.executed[route] += 1
+        else:
+            self.coalesced[route] += 1
+        return await asyncio.shield(task)
+
+    async def run_sync(self, key: Tuple[Hashable, ...], fn: Callable[..., Any], *args) -> Any:
+        """Coalesce a sync crud function of the form fn(db, *args) (run on a worker thread)"""
+        return await self.do(key, lambda: run_in_thread(fn, *args))
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the exception so it is not reported as unhandled when every waiter left
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Single-flight computation for {key!r} failed: {task.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        routes = sorted(set(self.executed) | set(self.coalesced))
+        per_route = {}
+        for route in routes:
+            executed, coalesced = self.executed[route], self.coalesced[route]
+            per_route[route] = {
+                "executed": executed,
+                "coalesced": coalesced,
+                "coalesced_ratio": round(coalesced / (executed + coalesced), 4),
+            }
+        return {
+            "in_flight": len(self._inflight),
+            "executed": sum(self.executed.values()),
+            "coalesced": sum(self.coalesced.values()),
+            "routes": per_route,
+        }
+
+
+# Create global instance
+single_flight = SingleFlight()
@@ -0,0 +1,305 @@
+# ============================================
+# Staged sync pipeline: fetch -> normalize -> batch-write
+# ============================================
+# File: server_py/sync_pipeline.py
+#
+# Stages run as asyncio workers joined by bounded queues, so RapidAPI
+# fetches keep going while earlier pages are written to the database:
+#
+#   jobs -> [fetch x N] -> queue -> [normalize x N] -> queue -> [write x N]
+#
+#   fetch      AsyncRapidAPIClient call (per-host quota, retries, response cache)
+#   normalize  job.normalize(data) -> (product rows, deal rows)
+#   write      drains up to SYNC_WRITE_BATCH rows from its queue and saves them
+#              with DatabaseService.save_products / save_deals on a thread,
+#              one DatabaseService (session) per write worker
+#
+# A full queue blocks the stage feeding it, which bounds memory when the DB
+# falls behind. Each job's async on_written(job, counts) callback is awaited once
+# its rows are saved and may submit() follow-up jobs (the category crawler uses
+# this to keep a window of pages in flight). It runs on the event loop, so any
+# blocking work in it belongs in asyncio.to_thread. Workers per stage: SYNC_FETCH_WORKERS,
+# SYNC_NORMALIZE_WORKERS, SYNC_WRITE_WORKERS; queue size: SYNC_QUEUE_SIZE.
+#
+# Per-stage throughput, utilization and queue depth are passed to the optional
+# on_progress(stats) callback every SYNC_PROGRESS_SECONDS and once at the end.
+# The scheduler worker stores them on the job's scheduler_jobs row, which is
+# what GET /sync/pipeline/status serves (the API never runs a pipeline itself).
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from server_py.database_config import PRODUCT_BATCH_SIZE, DatabaseService
+from server_py.rapidapi_async import AsyncRapidAPIClient
+
+logger = logging.getLogger(__name__)
+
+SYNC_FETCH_WORKERS = int(os.getenv("SYNC_FETCH_WORKERS", "8"))
+SYNC_NORMALIZE_WORKERS = int(os.getenv("SYNC_NORMALIZE_WORKERS", "1"))
+SYNC_WRITE_WORKERS = int(os.getenv("SYNC_WRITE_WORKERS", "1"))
+SYNC_QUEUE_SIZE = int(os.getenv("SYNC_QUEUE_SIZE", "32"))
+SYNC_WRITE_BATCH = int(os.getenv("SYNC_WRITE_BATCH", str(PRODUCT_BATCH_SIZE)))
+SYNC_PROGRESS_SECONDS = float(os.getenv("SYNC_PROGRESS_SECONDS", "5"))
+
+
+@dataclass
+class FetchJob:
+    """One API call and how to turn its response into rows"""
+    source: str  # label for per-source counts, e.g. "amazon_category"
+    method: str  # AsyncRapidAPIClient method name
+    args: tuple
+    normalize: Callable[[Dict], Tuple[List[dict], List[dict]]]  # -> (product rows, deal rows)
+    on_written: Optional[Callable[["FetchJob", Dict[str, Any]], Awaitable[None]]] = None
+
+
+@dataclass
+class RowBatch:
+    job: FetchJob
+    products: List[dict] = field(default_factory=list)
+    deals: List[dict] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+class StageStats:
+    """Work counters for one stage; utilization is busy time over workers x elapsed"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.jobs = self.rows = self.errors = 0
+        self.busy_seconds = 0.0
+        self.peak_queue = 0
+
+    def snapshot(self, elapsed: float, queue: Optional[asyncio.Queue]) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "jobs": self.jobs,
+            "rows": self.rows,
+            "errors": self.errors,
+            "jobs_per_sec": round(self.jobs / elapsed, 2) if elapsed else 0.0,
+            "rows_per_sec": round(self.rows / elapsed, 1) if elapsed else 0.0,
+            "utilization": round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else 0.0,
+            "queue_depth": queue.qsize() if queue is not None else 0,
+            "queue_peak": self.peak_queue,
+            "queue_max": queue.maxsize if queue is not None else SYNC_QUEUE_SIZE,
+        }
+
+
+class SyncPipeline:
+    """Runs FetchJobs through fetch -> normalize -> write with bounded queues between stages"""
+
+    def __init__(self, fetch_workers: int = SYNC_FETCH_WORKERS, normalize_workers: int = SYNC_NORMALIZE_WORKERS,
+                 write_workers: int = SYNC_WRITE_WORKERS, queue_size: int = SYNC_QUEUE_SIZE,
+                 write_batch: int = SYNC_WRITE_BATCH,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.queue_size = queue_size
+        self.write_batch = write_batch
+        self.on_progress = on_progress  # blocking is fine: it runs on a thread
+        # A cancelled report's thread may still be running when the final one starts
+        self._progress_lock = threading.Lock()
+        self.stages = {
+            "fetch": StageStats("fetch", fetch_workers),
+            "normalize": StageStats("normalize", normalize_workers),
+            "write": StageStats("write", write_workers),
+        }
+        self.counts: Counter = Counter()
+        self.sources: Dict[str, Counter] = {}
+        self.api_stats: Dict[str, Any] = {}
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._backlog: List[FetchJob] = []
+        self._outstanding = 0
+
+    def submit(self, job: FetchJob) -> None:
+        """Queue a job; callable before run() and from on_written callbacks during it"""
+        self._outstanding += 1
+        if self._queues:
+            self._queues["submitted"].put_nowait(job)
+        else:
+            self._backlog.append(job)
+
+    def _job_done(self) -> None:
+        self._outstanding -= 1
+        if self._outstanding == 0:
+            self._idle.set()
+
+    async def _put(self, stage: str, item: Any) -> None:
+        queue = self._queues[stage]
+        await queue.put(item)
+        self.stages[stage].peak_queue = max(self.stages[stage].peak_queue, queue.qsize())
+
+    async def run(self, jobs: Iterable[FetchJob] = ()) -> Dict[str, Any]:
+        for job in jobs:
+            self.submit(job)
+        self.started = time.perf_counter()
+        # "submitted" is unbounded so on_written can enqueue without blocking a writer
+        self._queues = {
+            "submitted": asyncio.Queue(),
+            "fetch": asyncio.Queue(self.queue_size),
+            "normalize": asyncio.Queue(self.queue_size),
+            "write": asyncio.Queue(self.queue_size),
+        }
+        for job in self._backlog:
+            self._queues["submitted"].put_nowait(job)
+        self._backlog.clear()
+        self._idle = asyncio.Event()
+        if self._outstanding == 0:
+            self._idle.set()
+
+        async with AsyncRapidAPIClient(concurrency=self.stages["fetch"].workers) as client:
+            workers = [asyncio.create_task(self._feed())]
+            workers += [asyncio.create_task(self._fetch(client)) for _ in range(self.stages["fetch"].workers)]
+            workers += [asyncio.create_task(self._normalize()) for _ in range(self.stages["normalize"].workers)]
+            workers += [asyncio.create_task(self._write()) for _ in range(self.stages["write"].workers)]
+            if self.on_progress:
+                workers.append(asyncio.create_task(self._report()))
+            try:
+                await self._idle.wait()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                self.api_stats = client.stats()
+                self.finished = time.perf_counter()
+
+        stats = self.stats()
+        logger.info(f"Sync pipeline finished in {stats['elapsed_seconds']}s: {dict(self.counts)}")
+        if self.on_progress:
+            await self._publish(stats)
+        return stats
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(SYNC_PROGRESS_SECONDS)
+            await self._publish(self.stats())
+
+    async def _publish(self, stats: Dict[str, Any]) -> None:
+        try:
+            await asyncio.to_thread(self._progress, stats)
+        except Exception as e:
+            logger.warning(f"Sync pipeline progress report failed: {e}")
+
+    async def _feed(self) -> None:
+        while True:
+            await self._put("fetch", await self._queues["submitted"].get())
+
+    async def _fetch(self, client: AsyncRapidAPIClient) -> None:
+        stats = self.stages["fetch"]
+        while True:
+            job = await self._queues["fetch"].get()
+            started = time.perf_counter()
+            try:
+                data = await getattr(client, job.method)(*job.args)
+            except Exception as e:
+                data = {"error": str(e)}
+            if not isinstance(data, dict):
+                data = {"error": f"unexpected {type(data).__name__} response from {job.method}"}
+            stats.busy_seconds += time.perf_counter() - started
+            stats.jobs += 1
+            stats.errors += bool(data.get("error"))
+            await self._put("normalize", (job, data))
+
+    async def _normalize(self) -> None:
+        stats = self.stages["normalize"]
+        while True:
+            job, data = await self._queues["normalize"].get()
+            started = time.perf_counter()
+            # Whatever goes wrong, the job still reaches _write as an error batch
+            try:
+                batch = RowBatch(job, error=data.get("error"))
+                if batch.error is None:
+                    batch.products, batch.deals = job.normalize(data)
+            except Exception as e:
+                batch = RowBatch(job, error=f"normalize failed: {e}")
+                stats.errors += 1
+            stats.busy_seconds += time.perf_counter() - started
+            stats.jobs += 1
+            stats.rows += len(batch.products) + len(batch.deals)
+            await self._put("write", batch)
+
+    async def _write(self) -> None:
+        stats = self.stages["write"]
+        queue = self._queues["write"]
+        db_service = DatabaseService()
+        try:
+            while True:
+                batches = [await queue.get()]
+                rows = len(batches[0].products)
+                while rows < self.write_batch and not queue.empty():
+                    batches.append(queue.get_nowait())
+                    rows += len(batches[-1].products)
+
+                started = time.perf_counter()
+                try:
+                    totals, results = await asyncio.to_thread(self._write_batches, db_service, batches)
+                    self.counts.update(totals)
+                except Exception as e:
+                    stats.errors += 1
+                    logger.error(f"Sync pipeline write of {rows} rows failed: {e}")
+                    results = [{"error": str(e), "items": 0} for _ in batches]
+                stats.busy_seconds += time.perf_counter() - started
+                stats.jobs += len(batches)
+
+                for batch, counts in zip(batches, results):
+                    try:
+                        stats.rows += counts.get("items", 0) + counts.get("deals", 0)
+                        self.sources.setdefault(batch.job.source, Counter()).update(
+                            {key: value for key, value in counts.items() if isinstance(value, int)}
+                        )
+                        self.sources[batch.job.source]["errors"] += "error" in counts
+                        if batch.job.on_written:
+                            await batch.job.on_written(batch.job, counts)
+                    except Exception as e:
+                        logger.error(f"on_written for {batch.job.source} {batch.job.args} failed: {e}")
+                    finally:
+                        # Exactly once per job, or run() never sees the pipeline go idle
+                        self._job_done()
+        finally:
+            db_service.close()
+
+    def _progress(self, stats: Dict[str, Any]) -> None:
+        with self._progress_lock:
+            self.on_progress(stats)
+
+    def _write_batches(self, db_service: DatabaseService, batches: List[RowBatch]) -> Tuple[Counter, List[Dict[str, Any]]]:
+        """Save the rows of several jobs together; returns the totals and each job's own counts"""
+        outcomes: Dict[str, str] = {}
+        totals: Counter = Counter()
+        products = [row for batch in batches for row in batch.products]
+        deals = [row for batch in batches for row in batch.deals]
+        if products:
+            saved = db_service.save_products(products, outcomes=outcomes)
+            totals.update({key: saved[key] for key in ("new", "changed", "unchanged", "skipped")})
+        if deals:
+            totals["deals"] += db_service.save_deals(deals)
+
+        results = []
+        for batch in batches:
+            if batch.error is not None:
+                results.append({"error": batch.error, "items": 0})
+                continue
+            counts = Counter(outcomes[row["product_id"]] for row in batch.products if row.get("product_id") in outcomes)
+            results.append({"items": len(batch.products), "deals": len(batch.deals),
+                            **{key: counts[key] for key in ("new", "changed", "unchanged")}})
+        return totals, results
+
+    def stats(self) -> Dict[str, Any]:
+        if self.started is None:
+            return {"running": False, "elapsed_seconds": 0.0, "stages": {}, "counts": {}}
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "running": self.finished is None,
+            "elapsed_seconds": round(elapsed, 2),
+            "stages": {name: stage.snapshot(elapsed, self._queues.get(name)) for name, stage in self.stages.items()},
+            "counts": dict(self.counts),
+            "sources": {source: dict(counts) for source, counts in self.sources.items()},
+            "api": self.api_stats,
+        }
+
@@ -0,0 +1,52 @@
+"""AIAnswerCache stats: every lookup is a hit in one tier or a miss in the last one"""
+
+from server_py.ai_cache import AIAnswerCache
+
+
+def make_cache(monkeypatch, disk_path=None):
+    if disk_path:
+        monkeypatch.setenv("AI_CACHE_SQLITE_PATH", str(disk_path))
+    else:
+        monkeypatch.delenv("AI_CACHE_SQLITE_PATH", raising=False)
+    return AIAnswerCache()
+
+
+def test_local_only_counts_each_lookup_once(monkeypatch):
+    cache = make_cache(monkeypatch)
+
+    assert cache.get("q") is None
+    cache.set("q", "answer", seconds=2.0)
+    assert cache.get("q") == "answer"
+    assert cache.get("q") == "answer"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert (stats["local"]["hits"], stats["local"]["misses"]) == (2, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+    assert stats["mean_generation_seconds"] == 2.0
+
+
+def test_disk_tier_owns_the_miss(monkeypatch, tmp_path):
+    path = tmp_path / "ai.sqlite"
+    first = make_cache(monkeypatch, path)
+    assert first.get("q") is None
+    first.set("q", "answer", seconds=1.0)
+
+    # Another worker: local miss, disk hit, then a local hit
+    second = make_cache(monkeypatch, path)
+    assert second.get("q") == "answer"
+    assert second.get("q") == "answer"
+    assert second.get("other") is None
+
+    stats = second.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["local"]["hits"] + stats["disk"]["hits"] == stats["hits"]
+    assert stats["disk"]["misses"] == stats["misses"]
+    assert stats["mean_generation_seconds"] is None
+
+
+def test_unused_cache_reports_no_rates(monkeypatch):
+    stats = make_cache(monkeypatch).stats()
+
+    assert stats["hit_rate"] is None
+    assert stats["llm_seconds_saved"] is None
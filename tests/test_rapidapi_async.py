@@ -0,0 +1,98 @@
+"""TokenBucket refill and AsyncRapidAPIClient backoff bounds"""
+
+import random
+import threading
+
+import pytest
+
+from server_py import rapidapi_async
+from server_py.rapidapi_async import AsyncRapidAPIClient, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rapidapi_async.time, "monotonic", clock)
+    return clock
+
+
+def test_burst_is_free_then_tokens_are_reserved_at_the_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    delays = [bucket._reserve() for _ in range(5)]
+
+    assert delays == [0.0, 0.0, 0.0, 0.5, 1.0]
+    assert bucket.waited_seconds == 1.5
+
+
+def test_tokens_refill_with_elapsed_time(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    for _ in range(3):
+        bucket._reserve()
+
+    clock.now += 1.0  # two tokens back
+
+    assert [bucket._reserve() for _ in range(3)] == [0.0, 0.0, 0.5]
+
+
+def test_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    bucket._reserve()
+
+    clock.now += 3600
+
+    assert [bucket._reserve() for _ in range(4)] == [0.0, 0.0, 0.0, 0.5]
+
+
+def test_waited_seconds_matches_reservations_across_threads(clock):
+    bucket = TokenBucket(rate=100, burst=5)
+    delays = []
+    delays_lock = threading.Lock()
+
+    def reserve_many():
+        for _ in range(200):
+            delay = bucket._reserve()
+            with delays_lock:
+                delays.append(delay)
+
+    threads = [threading.Thread(target=reserve_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(delays) == 1600
+    assert bucket.waited_seconds == pytest.approx(sum(delays))
+    # The clock never moved: the n-th reservation past the burst waits n / rate
+    assert max(delays) == pytest.approx((1600 - 5) / 100)
+
+
+@pytest.mark.parametrize("attempt", range(8))
+def test_backoff_is_full_jitter_within_the_cap(attempt):
+    client = AsyncRapidAPIClient()
+    cap = min(rapidapi_async.RAPIDAPI_BACKOFF_MAX, rapidapi_async.RAPIDAPI_BACKOFF_BASE * 2 ** attempt)
+    random.seed(attempt)
+
+    delays = [client._backoff(attempt) for _ in range(500)]
+
+    assert all(0 <= delay <= cap for delay in delays)
+    # Jittered, not a fixed step: the samples cover most of [0, cap]
+    assert min(delays) < cap * 0.1
+    assert max(delays) > cap * 0.9
+
+
+def test_backoff_honours_retry_after_up_to_the_cap():
+    client = AsyncRapidAPIClient()
+
+    assert client._backoff(0, "3") == 3.0
+    assert client._backoff(0, "86400") == rapidapi_async.RAPIDAPI_BACKOFF_MAX
+    # An HTTP-date Retry-After falls back to jitter
+    assert 0 <= client._backoff(1, "Wed, 21 Oct 2026 07:28:00 GMT") <= rapidapi_async.RAPIDAPI_BACKOFF_BASE * 2
@@ -0,0 +1,164 @@
+"""SyncPipeline idle accounting: every job reaches _write once and run() returns"""
+
+import asyncio
+
+import pytest
+
+from server_py import sync_pipeline
+from server_py.sync_pipeline import FetchJob, SyncPipeline
+
+
+class FakeClient:
+    """Stands in for AsyncRapidAPIClient: method name -> response (or exception to raise)"""
+
+    responses = {}
+
+    def __init__(self, concurrency=None):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def __getattr__(self, method):
+        async def call(*args):
+            response = self.responses[method]
+            if isinstance(response, Exception):
+                raise response
+            return response(*args) if callable(response) else response
+        return call
+
+    def stats(self):
+        return {}
+
+
+class FakeDatabaseService:
+    """Stands in for DatabaseService: every product is new; fail=True raises on save"""
+
+    fail = False
+    saved = []
+
+    def save_products(self, products, outcomes=None):
+        if self.fail:
+            raise RuntimeError("database is down")
+        self.saved.extend(products)
+        for row in products:
+            outcomes[row["product_id"]] = "new"
+        return {"new": len(products), "changed": 0, "unchanged": 0, "skipped": 0}
+
+    def save_deals(self, deals):
+        return len(deals)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fakes(monkeypatch):
+    monkeypatch.setattr(sync_pipeline, "AsyncRapidAPIClient", FakeClient)
+    monkeypatch.setattr(sync_pipeline, "DatabaseService", FakeDatabaseService)
+    monkeypatch.setattr(FakeClient, "responses", {
+        "search": lambda query, page=1: {"results": [{"id": f"{query}-{page}"}]},
+    })
+    monkeypatch.setattr(FakeDatabaseService, "fail", False)
+    monkeypatch.setattr(FakeDatabaseService, "saved", [])
+
+
+def rows(data):
+    return [{"product_id": item["id"]} for item in data["results"]], []
+
+
+def run(jobs, **kwargs):
+    # A broken idle count hangs run(); fail the test instead
+    return asyncio.run(asyncio.wait_for(SyncPipeline(**kwargs).run(jobs), timeout=5))
+
+
+def test_healthy_jobs_are_saved():
+    stats = run([FetchJob("search", "search", ("phone", page), rows) for page in (1, 2, 3)])
+
+    assert stats["sources"]["search"]["new"] == 3
+    assert stats["sources"]["search"]["errors"] == 0
+    assert stats["counts"]["new"] == 3
+    assert stats["running"] is False
+
+
+def test_fetch_exception_becomes_error_batch():
+    FakeClient.responses["broken"] = RuntimeError("connection reset")
+
+    stats = run([FetchJob("bad", "broken", (), rows), FetchJob("good", "search", ("phone",), rows)])
+
+    assert stats["sources"]["bad"] == {"items": 0, "errors": 1}
+    assert stats["sources"]["good"]["new"] == 1
+    assert stats["stages"]["fetch"]["errors"] == 1
+
+
+def test_non_dict_response_becomes_error_batch():
+    FakeClient.responses["listing"] = [{"id": "x"}]
+
+    stats = run([FetchJob("list", "listing", (), rows), FetchJob("good", "search", ("phone",), rows)])
+
+    assert stats["sources"]["list"] == {"items": 0, "errors": 1}
+    assert stats["sources"]["good"]["new"] == 1
+    assert stats["stages"]["fetch"]["errors"] == 1
+
+
+def test_normalize_exception_becomes_error_batch():
+    def broken(data):
+        raise KeyError("results")
+
+    stats = run([FetchJob("bad", "search", ("phone",), broken), FetchJob("good", "search", ("tv",), rows)])
+
+    assert stats["sources"]["bad"] == {"items": 0, "errors": 1}
+    assert stats["sources"]["good"]["new"] == 1
+    assert stats["stages"]["normalize"]["errors"] == 1
+
+
+def test_write_exception_fails_every_job_in_the_batch():
+    FakeDatabaseService.fail = True
+    written = []
+
+    async def on_written(job, counts):
+        written.append(counts)
+
+    stats = run([FetchJob("search", "search", ("phone", page), rows, on_written) for page in (1, 2)])
+
+    assert stats["sources"]["search"] == {"items": 0, "errors": 2}
+    assert stats["stages"]["write"]["errors"] >= 1
+    assert len(written) == 2
+    assert all("database is down" in counts["error"] for counts in written)
+
+
+def test_on_written_can_submit_follow_up_jobs():
+    pipeline = SyncPipeline()
+
+    async def next_page(job, counts):
+        query, page = job.args
+        if page < 3:
+            pipeline.submit(FetchJob("crawl", "search", (query, page + 1), rows, next_page))
+
+    stats = asyncio.run(asyncio.wait_for(pipeline.run([FetchJob("crawl", "search", ("phone", 1), rows, next_page)]),
+                                         timeout=5))
+
+    assert stats["sources"]["crawl"]["new"] == 3
+    assert stats["sources"]["crawl"]["errors"] == 0
+    assert sorted(row["product_id"] for row in FakeDatabaseService.saved) == ["phone-1", "phone-2", "phone-3"]
+
+
+def test_failing_on_written_still_finishes_the_job():
+    async def broken(job, counts):
+        raise RuntimeError("checkpoint failed")
+
+    stats = run([FetchJob("search", "search", ("phone",), rows, broken)])
+
+    assert stats["sources"]["search"]["new"] == 1
+
+
+def test_progress_is_reported_with_final_stats():
+    reports = []
+
+    stats = run([FetchJob("search", "search", ("phone",), rows)], on_progress=reports.append)
+
+    assert reports[-1] == stats
+    assert reports[-1]["running"] is False